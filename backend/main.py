@@ -3,13 +3,16 @@ PinProfit — Main FastAPI Application
 Affiliate Marketing + Pinterest Publishing System
 """
 import os
+import asyncio
+import hashlib
 import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,12 +20,17 @@ load_dotenv()
 from models.database import init_db
 from routers import dashboard, research, products, publisher, analytics, evolution, settings_router
 from services.scheduler import start_scheduler, stop_scheduler
+from services.http_client import close_http_client
+from services.email_service import close_smtp
+from services.scraper import close_scrape_client
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 logger = logging.getLogger(__name__)
 
-# Active WebSocket connections for research progress
-research_ws_connections: dict[int, list[WebSocket]] = {}
+# Research progress pub/sub — one bounded queue of pre-encoded JSON per connected WebSocket
+research_ws_queues: dict[int, set[asyncio.Queue]] = {}
+RESEARCH_WS_QUEUE_SIZE = 64
+RESEARCH_WS_TIMEOUT = 2 * 60 * 60  # idle cap per socket, seconds
 
 
 @asynccontextmanager
@@ -41,6 +49,9 @@ async def lifespan(app: FastAPI):
 
     logger.info("PinProfit shutting down...")
     await stop_scheduler()
+    await close_http_client()
+    await close_smtp()
+    await close_scrape_client()
 
 
 app = FastAPI(
@@ -48,17 +59,27 @@ app = FastAPI(
     description="Affiliate Marketing + Pinterest Publishing System",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# CORS — needed for Vite dev server
+# CORS — needed for Vite dev server (prod SPA is same-origin).
+# Extra origins can be listed comma-separated in CORS_ORIGINS.
+CORS_ORIGINS = ["http://localhost:5173", "http://localhost:3000"] + [
+    o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:3000", "*"],
+    allow_origins=CORS_ORIGINS,
+    allow_origin_regex=r"^https://pinprofit-system(-[a-z0-9-]+)?\.onrender\.com$",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
+# Compress JSON lists and the SPA shell (WebSockets pass through untouched)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # ── API Routes ─────────────────────────────────
 app.include_router(dashboard.router,         prefix="/api/dashboard",  tags=["Dashboard"])
 app.include_router(research.router,          prefix="/api/research",   tags=["Research"])
@@ -79,14 +100,40 @@ async def health():
 @app.websocket("/ws/research/{session_id}")
 async def research_websocket(websocket: WebSocket, session_id: int):
     await websocket.accept()
-    if session_id not in research_ws_connections:
-        research_ws_connections[session_id] = []
-    research_ws_connections[session_id].append(websocket)
-    try:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=RESEARCH_WS_QUEUE_SIZE)
+    research_ws_queues.setdefault(session_id, set()).add(queue)
+
+    async def pump():
         while True:
-            await websocket.receive_text()  # Keep alive
-    except WebSocketDisconnect:
-        research_ws_connections[session_id].remove(websocket)
+            msg = await asyncio.wait_for(queue.get(), timeout=RESEARCH_WS_TIMEOUT)
+            if msg is None:  # session finished
+                return
+            await websocket.send_text(msg)
+
+    async def watch_disconnect():
+        # Server-push only — client frames are ignored, but reading is how a disconnect shows up
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = {asyncio.create_task(pump()), asyncio.create_task(watch_disconnect())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            e = task.exception()
+            if e and not isinstance(e, (asyncio.TimeoutError, WebSocketDisconnect)):
+                logger.debug(f"Research WebSocket {session_id} closed: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        queues = research_ws_queues.get(session_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del research_ws_queues[session_id]
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
 
 # ── Serve React SPA ───────────────────────────
@@ -95,10 +142,29 @@ static_dir = Path(__file__).parent.parent / "frontend" / "dist"
 if not static_dir.exists():
     static_dir = Path(__file__).parent / "static"
 
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for Vite's content-hashed assets — safe to cache forever."""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
 if static_dir.exists():
-    app.mount("/assets", StaticFiles(directory=static_dir / "assets"), name="assets")
+    app.mount("/assets", ImmutableStaticFiles(directory=static_dir / "assets"), name="assets")
+
+    # Read once at startup; index.html only changes on redeploy
+    INDEX_HTML = (static_dir / "index.html").read_bytes()
+    INDEX_ETAG = '"' + hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest() + '"'
+    INDEX_HEADERS = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
 
     @app.get("/{full_path:path}", include_in_schema=False)
-    async def serve_spa(full_path: str):
-        index = static_dir / "index.html"
-        return FileResponse(index)
+    async def serve_spa(full_path: str, request: Request):
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if INDEX_ETAG in tags or "*" in tags:
+            return Response(status_code=304, headers=INDEX_HEADERS)
+        return Response(INDEX_HTML, media_type="text/html", headers=INDEX_HEADERS)
@@ -5,11 +5,19 @@ All table operations go through supabase.table().
 """
 import os
 import json
+import time
 import logging
+import threading
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# In-process settings cache: key -> (value, expires_at on time.monotonic())
+SETTINGS_CACHE_TTL = 60
+SETTINGS_MISS_TTL = 5  # absent keys — short so a key saved by another worker shows up quickly
+_settings_cache: dict[str, tuple[str | None, float]] = {}
+_settings_lock = threading.Lock()
+
 
 # ── Table Migration SQL ──────────────────────
 
@@ -188,6 +196,144 @@ CREATE TABLE IF NOT EXISTS evolution_learning_history (
     insights TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
+
+-- RPC functions (server-side aggregates)
+CREATE OR REPLACE FUNCTION analytics_overview()
+RETURNS TABLE (
+    total_pins BIGINT,
+    total_clicks BIGINT,
+    total_saves BIGINT,
+    total_commission DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        count(*),
+        coalesce(sum(coalesce(pinterest_clicks, 0) + coalesce(instagram_clicks, 0)), 0),
+        coalesce(sum(pinterest_saves), 0),
+        coalesce(sum(estimated_commission), 0)
+    FROM published_pins
+    WHERE status = 'posted';
+$$;
+
+CREATE OR REPLACE FUNCTION dashboard_stats(today_iso TEXT)
+RETURNS TABLE (
+    pins_today BIGINT,
+    total_clicks BIGINT,
+    commission DOUBLE PRECISION,
+    pending BIGINT
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        count(*) FILTER (WHERE status = 'posted' AND posted_at >= today_iso::timestamptz),
+        coalesce(sum(coalesce(pinterest_clicks, 0) + coalesce(instagram_clicks, 0))
+            FILTER (WHERE status = 'posted'), 0),
+        coalesce(sum(estimated_commission) FILTER (WHERE status = 'posted'), 0),
+        count(*) FILTER (WHERE status = 'pending')
+    FROM published_pins;
+$$;
+
+CREATE OR REPLACE FUNCTION recent_activity(limit_n INT DEFAULT 10)
+RETURNS TABLE (
+    log_type TEXT,
+    data TEXT,
+    created_at TIMESTAMPTZ
+)
+LANGUAGE sql STABLE AS $$
+    SELECT log_type, data, created_at
+    FROM evolution_log
+    ORDER BY created_at DESC
+    LIMIT limit_n;
+$$;
+
+CREATE OR REPLACE FUNCTION evolution_summary(history_limit INT DEFAULT 20)
+RETURNS JSON
+LANGUAGE sql STABLE AS $$
+    SELECT json_build_object(
+        'memory', coalesce(
+            (SELECT json_object_agg(key, value) FROM evolution_strategy_memory),
+            '{}'::json),
+        'history', coalesce(
+            (SELECT json_agg(h ORDER BY h.created_at DESC) FROM (
+                SELECT * FROM evolution_learning_history
+                ORDER BY created_at DESC
+                LIMIT history_limit
+            ) h),
+            '[]'::json)
+    );
+$$;
+
+-- Nightly evolution write-back: strategy memory + learning history in one call
+CREATE OR REPLACE FUNCTION nightly_evolution_commit(
+    top_niches_json JSONB,
+    insight_text TEXT,
+    session_count INT,
+    run_at TEXT
+)
+RETURNS VOID
+LANGUAGE sql AS $$
+    INSERT INTO evolution_strategy_memory (key, value, updated_at) VALUES
+        ('top_niches', top_niches_json::text, NOW()),
+        ('last_updated', run_at, NOW())
+    ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO evolution_learning_history (date, research_sessions, insights)
+    VALUES (run_at, session_count, insight_text);
+$$;
+
+-- Research sessions per niche for the nightly analysis.
+-- Older rows hold the event as a JSON string inside the jsonb column.
+CREATE OR REPLACE FUNCTION research_niche_counts(limit_n INT DEFAULT 10)
+RETURNS JSON
+LANGUAGE sql STABLE AS $$
+    WITH events AS (
+        SELECT CASE WHEN jsonb_typeof(data) = 'string'
+                    THEN (data #>> '{}')::jsonb ELSE data END AS data
+        FROM evolution_performance_log
+        WHERE event_type = 'research_complete'
+    ), counts AS (
+        SELECT coalesce(data->>'niche', 'unknown') AS niche, count(*) AS n
+        FROM events
+        GROUP BY 1
+    )
+    SELECT json_build_object(
+        'sessions', (SELECT count(*) FROM events),
+        'top_niches', coalesce(
+            (SELECT json_agg(json_build_array(niche, n) ORDER BY n DESC)
+             FROM (SELECT * FROM counts ORDER BY n DESC LIMIT limit_n) t),
+            '[]'::json)
+    );
+$$;
+
+-- Indexes
+-- Partial indexes key on the column the queries filter or sort by (status is
+-- constant inside each predicate); the old status-keyed ones are dropped
+DROP INDEX IF EXISTS idx_published_pins_posted;
+DROP INDEX IF EXISTS idx_published_pins_pending;
+DROP INDEX IF EXISTS idx_published_pins_status_posted_at;
+CREATE INDEX IF NOT EXISTS idx_published_pins_posted_at
+    ON published_pins (posted_at DESC) WHERE status = 'posted';
+CREATE INDEX IF NOT EXISTS idx_published_pins_pending_created
+    ON published_pins (created_at DESC) WHERE status = 'pending';
+-- Trigram indexes back the ilike '%…%' filters in list_products
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_products_title_trgm
+    ON products USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_description_trgm
+    ON products USING gin (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_niche_trgm
+    ON products USING gin (niche gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_platform_trgm
+    ON products USING gin (platform gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_evolution_learning_history_created_at
+    ON evolution_learning_history (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_evolution_log_created_at
+    ON evolution_log (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_evolution_performance_log_event_type
+    ON evolution_performance_log (event_type);
+-- Next-due lookup for the pin publisher loop
+CREATE INDEX IF NOT EXISTS idx_published_pins_pending_scheduled
+    ON published_pins (scheduled_time) WHERE status = 'pending' AND scheduled_time IS NOT NULL;
 """
 
 
@@ -210,6 +356,7 @@ async def init_db():
 
     # Seed default settings
     await _seed_default_settings()
+    warm_settings_cache()
     logger.info("Database initialized.")
 
 
@@ -233,45 +380,123 @@ async def _seed_default_settings():
         "GMAIL_APP_PASSWORD":      "gmail_app_password",
     }
 
-    sb = get_supabase()
-    for env_key, db_key in env_to_db.items():
-        val = os.getenv(env_key, "")
-        if val:
-            try:
-                existing = sb.table("settings").select("key").eq("key", db_key).execute()
-                if not existing.data:
-                    sb.table("settings").insert({
-                        "key": db_key,
-                        "value": val,
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                    }).execute()
-            except Exception as e:
-                logger.warning(f"Could not seed setting {db_key}: {e}")
+    now_iso = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"key": db_key, "value": os.getenv(env_key), "updated_at": now_iso}
+        for env_key, db_key in env_to_db.items()
+        if os.getenv(env_key, "")
+    ]
+    if not rows:
+        return
+
+    # One round trip; existing keys are left untouched
+    try:
+        get_supabase().table("settings").upsert(
+            rows, on_conflict="key", ignore_duplicates=True,
+        ).execute()
+    except Exception as e:
+        logger.warning(f"Could not seed default settings: {e}")
 
 
 # ── Helper functions used by routers ──────────
 
+def warm_settings_cache():
+    """Load every setting in one query so most reads never hit Supabase."""
+    from services.supabase_client import get_supabase
+    try:
+        result = get_supabase().table("settings").select("key,value").execute()
+    except Exception as e:
+        logger.warning(f"Could not warm settings cache: {e}")
+        return
+    now = time.monotonic()
+    with _settings_lock:
+        for row in result.data or []:
+            _cache_setting(row["key"], row.get("value"), now)
+
+
+def _cache_setting(key: str, value: str | None, now: float):
+    """Store a value (or a miss, briefly) in the settings cache; caller holds _settings_lock."""
+    ttl = SETTINGS_CACHE_TTL if value is not None else SETTINGS_MISS_TTL
+    _settings_cache[key] = (value, now + ttl)
+
+
+def cache_settings(values: dict[str, str | None]):
+    """Store just-written settings in the cache — call after the upsert, never before."""
+    now = time.monotonic()
+    with _settings_lock:
+        for key, value in values.items():
+            _cache_setting(key, value, now)
+
+
+def invalidate_setting(key: str | None = None):
+    """Drop one cached setting, or the whole cache when key is None."""
+    with _settings_lock:
+        if key is None:
+            _settings_cache.clear()
+        else:
+            _settings_cache.pop(key, None)
+
+
 def get_setting_sync(key: str) -> str | None:
-    """Get a setting value from Supabase (synchronous)."""
+    """Get a setting value from Supabase (synchronous, TTL-cached)."""
+    with _settings_lock:
+        cached = _settings_cache.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
     from services.supabase_client import get_supabase
     try:
         result = get_supabase().table("settings").select("value").eq("key", key).execute()
-        if result.data:
-            return result.data[0]["value"]
+        value = result.data[0]["value"] if result.data else None
+    except Exception:
+        return None
+    with _settings_lock:
+        _cache_setting(key, value, time.monotonic())
+    return value
+
+
+def get_settings_sync(keys: list[str]) -> dict[str, str]:
+    """Get several settings at once; only cache misses go to Supabase (one query)."""
+    now = time.monotonic()
+    found, missing = {}, []
+    with _settings_lock:
+        for key in keys:
+            cached = _settings_cache.get(key)
+            if cached and cached[1] > now:
+                if cached[0] is not None:
+                    found[key] = cached[0]
+            else:
+                missing.append(key)
+    if not missing:
+        return found
+
+    from services.supabase_client import get_supabase, note_connection_ok
+    try:
+        result = get_supabase().table("settings").select("key,value").in_("key", missing).execute()
     except Exception:
-        pass
-    return None
+        return found
+    note_connection_ok()
+    fetched = {row["key"]: row["value"] for row in result.data or []}
+    now = time.monotonic()
+    with _settings_lock:
+        for key in missing:
+            _cache_setting(key, fetched.get(key), now)
+    found.update({k: v for k, v in fetched.items() if v is not None})
+    return found
 
 
 def set_setting_sync(key: str, value: str):
     """Upsert a setting value to Supabase (synchronous)."""
     from services.supabase_client import get_supabase
+    row = {
+        "key": key,
+        "value": value,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
     try:
-        get_supabase().table("settings").upsert({
-            "key": key,
-            "value": value,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).execute()
+        get_supabase().table("settings").upsert(row).execute()
     except Exception as e:
         from services.supabase_client import queue_write
-        queue_write("settings", "upsert", {"key": key, "value": value, "updated_at": datetime.now(timezone.utc).isoformat()})
+        queue_write("settings", "upsert", row)
+    # Cache after the write (queued writes included) so a concurrent read can't re-cache the old value
+    cache_settings({key: value})
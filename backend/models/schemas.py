@@ -49,9 +49,10 @@ class ProductOut(BaseModel):
 
 class ProductListOut(BaseModel):
     items: List[ProductOut]
-    total: int
+    total: Optional[int] = None  # omitted on keyset (cursor) pages
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
 
 
 # ── Published Pins ─────────────────────────────
@@ -73,7 +74,7 @@ class PinOut(BaseModel):
 
 class PinListOut(BaseModel):
     items: List[PinOut]
-    total: int
+    total: Optional[int] = None
 
 
 # ── Settings ───────────────────────────────────
@@ -1,8 +1,9 @@
+import asyncio
 from fastapi import APIRouter
 from datetime import datetime, timezone, timedelta
 from services.supabase_client import get_supabase
 from models.schemas import DashboardStats, ActivityOut, ActivityItem
-import json
+import orjson
 
 router = APIRouter()
 
@@ -13,26 +14,18 @@ async def get_stats():
 
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    # Pins posted today
+    # Pins today + total clicks + commission + pending in one round trip
     try:
-        r = sb.table("published_pins").select("id", count="exact").eq("status", "posted").gte("posted_at", f"{today}T00:00:00Z").execute()
-        pins_today = r.count or 0
+        r = await asyncio.to_thread(
+            sb.rpc("dashboard_stats", {"today_iso": f"{today}T00:00:00Z"}).execute
+        )
+        row = (r.data or [{}])[0]
+        pins_today = row.get("pins_today") or 0
+        total_clicks = row.get("total_clicks") or 0
+        commission = row.get("commission") or 0.0
+        pending = row.get("pending") or 0
     except Exception:
         pins_today = 0
-
-    # Total clicks + commission + pending
-    try:
-        r = sb.table("published_pins").select("pinterest_clicks,instagram_clicks,estimated_commission,status").execute()
-        total_clicks = 0
-        commission = 0.0
-        pending = 0
-        for row in r.data or []:
-            if row.get("status") == "posted":
-                total_clicks += (row.get("pinterest_clicks") or 0) + (row.get("instagram_clicks") or 0)
-                commission += row.get("estimated_commission") or 0
-            if row.get("status") == "pending":
-                pending += 1
-    except Exception:
         total_clicks = 0
         commission = 0.0
         pending = 0
@@ -49,25 +42,27 @@ async def get_stats():
 async def get_activity():
     sb = get_supabase()
 
+    now = datetime.now(timezone.utc)
+
     def _time_ago(dt_str):
         if not dt_str:
             return "—"
         try:
             dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-            diff = datetime.now(timezone.utc) - dt
-            if diff.seconds < 60:    return "Just now"
-            if diff.seconds < 3600:  return f"{diff.seconds // 60}m ago"
-            if diff.days < 1:        return f"{diff.seconds // 3600}h ago"
-            return f"{diff.days}d ago"
+            secs = int((now - dt).total_seconds())
+            if secs < 60:    return "Just now"
+            if secs < 3600:  return f"{secs // 60}m ago"
+            if secs < 86400: return f"{secs // 3600}h ago"
+            return f"{secs // 86400}d ago"
         except Exception:
             return "—"
 
     try:
-        r = sb.table("evolution_log").select("*").order("created_at", desc=True).limit(10).execute()
+        r = await asyncio.to_thread(sb.rpc("recent_activity", {"limit_n": 10}).execute)
         items = []
         for i, log in enumerate(r.data or []):
             try:
-                data = json.loads(log.get("data") or '{}')
+                data = orjson.loads(log.get("data") or "{}")
                 msg = data.get("message", log.get("log_type", "Event").replace("_", " ").title())
             except Exception:
                 msg = log.get("log_type", "Event").replace("_", " ").title()
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter
 from services.supabase_client import get_supabase
 
@@ -8,13 +9,11 @@ router = APIRouter()
 async def evolution_summary():
     sb = get_supabase()
     try:
-        # Strategy memory
-        mem_r = sb.table("evolution_strategy_memory").select("key,value").execute()
-        memory = {row["key"]: row.get("value") for row in mem_r.data or []}
-
-        # Learning history — latest 20 entries
-        hist_r = sb.table("evolution_learning_history").select("*").order("created_at", desc=True).limit(20).execute()
-        history = {"nightly_runs": hist_r.data or []}
+        # Strategy memory + latest 20 learning-history entries in one call
+        r = await asyncio.to_thread(sb.rpc("evolution_summary", {"history_limit": 20}).execute)
+        summary = r.data or {}
+        memory = summary.get("memory") or {}
+        history = {"nightly_runs": summary.get("history") or []}
 
         return {"memory": memory, "history": history}
     except Exception:
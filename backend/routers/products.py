@@ -1,9 +1,45 @@
+import base64
+import asyncio
+import orjson
 from fastapi import APIRouter, Query, HTTPException
 from services.supabase_client import get_supabase
 from models.schemas import ProductOut, ProductListOut
 
 router = APIRouter()
 
+# sort query param -> (column, descending)
+_SORT_MAP = {
+    "score":      ("score", True),
+    "commission": ("commission_estimate", True),
+    "rating":     ("rating", True),
+    "price_asc":  ("price", False),
+    "price_desc": ("price", True),
+}
+_DEFAULT_SORT = _SORT_MAP["score"]
+
+# Only the columns ProductOut exposes — skips the large text/JSON columns
+_PRODUCT_COLUMNS = ",".join(ProductOut.model_fields)
+
+
+def _encode_cursor(value, row_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([value, row_id])).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        value, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _keyset_filter(col: str, desc: bool, value, row_id: int) -> str:
+    """PostgREST or-filter for rows after (value, id) in (col, id) order, NULLs last."""
+    op = "lt" if desc else "gt"
+    if value is None:
+        return f"and({col}.is.null,id.{op}.{row_id})"
+    return f"{col}.{op}.{value},and({col}.eq.{value},id.{op}.{row_id}),{col}.is.null"
+
 
 @router.get("", response_model=ProductListOut)
 async def list_products(
@@ -13,9 +49,13 @@ async def list_products(
     search: str = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=50),
+    cursor: str = Query(None),
 ):
+    """List products. Pass the previous response's next_cursor to page by keyset;
+    without it, `page` falls back to OFFSET paging."""
     sb = get_supabase()
-    q = sb.table("products").select("*", count="exact")
+    # Exact count only on the first request — keyset pages keep the client's first total
+    q = sb.table("products").select(_PRODUCT_COLUMNS, count=None if cursor else "exact")
 
     if niche:
         q = q.ilike("niche", f"%{niche}%")
@@ -24,32 +64,36 @@ async def list_products(
     if search:
         q = q.or_(f"title.ilike.%{search}%,description.ilike.%{search}%")
 
-    # Sort
-    sort_map = {
-        "score":      ("score", True),
-        "commission": ("commission_estimate", True),
-        "rating":     ("rating", True),
-        "price_asc":  ("price", False),
-        "price_desc": ("price", True),
-    }
-    col, desc = sort_map.get(sort, ("score", True))
-    q = q.order(col, desc=desc)
+    # Sort — id breaks ties so keyset pages are stable
+    col, desc = _SORT_MAP.get(sort, _DEFAULT_SORT)
+    q = q.order(col, desc=desc, nullsfirst=False).order("id", desc=desc)
 
     # Paginate
-    offset = (page - 1) * per_page
-    q = q.range(offset, offset + per_page - 1)
+    if cursor:
+        value, row_id = _decode_cursor(cursor)
+        q = q.or_(_keyset_filter(col, desc, value, row_id)).limit(per_page)
+    else:
+        offset = (page - 1) * per_page
+        q = q.range(offset, offset + per_page - 1)
 
-    result = q.execute()
-    total = result.count or 0
+    result = await asyncio.to_thread(q.execute)
+    total = None if cursor else result.count or 0
     items = result.data or []
 
-    return ProductListOut(items=items, total=total, page=page, per_page=per_page)
+    next_cursor = None
+    if len(items) == per_page:
+        last = items[-1]
+        next_cursor = _encode_cursor(last.get(col), last["id"])
+
+    return ProductListOut(items=items, total=total, page=page, per_page=per_page, next_cursor=next_cursor)
 
 
 @router.get("/{product_id}", response_model=ProductOut)
 async def get_product(product_id: int):
     sb = get_supabase()
-    result = sb.table("products").select("*").eq("id", product_id).execute()
+    result = await asyncio.to_thread(
+        sb.table("products").select(_PRODUCT_COLUMNS).eq("id", product_id).execute
+    )
     if not result.data:
         raise HTTPException(status_code=404, detail="Product not found")
     return result.data[0]
@@ -1,24 +1,108 @@
-import os
-import json
+import asyncio
+import hashlib
 import logging
+import time
+import orjson
+from contextlib import aclosing
 from datetime import datetime, timezone
-from pathlib import Path
-from fastapi import APIRouter, Query, File, UploadFile, Form
+from fastapi import APIRouter, BackgroundTasks, Query, File, UploadFile, Form
 from services.supabase_client import get_supabase
+from services.affiliate_manager import generate_amazon_affiliate_link_sync, generate_cuelinks_link
+from services.content_generator import generate_pin_content as generate_content, calculate_best_posting_time
+from services.instagram_api import InstagramAPI
+from services.pinterest_api import PinterestAPI
+from services.storage_manager import upload_pin_image
+from models.database import get_setting_sync
 from models.schemas import PinOut, PinListOut
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# One concurrency cap per external publishing API
+_PINTEREST_SEM = asyncio.Semaphore(4)
+_INSTAGRAM_SEM = asyncio.Semaphore(4)
+
+# Product columns read by content generation and publishing
+_PIN_PRODUCT_COLUMNS = (
+    "id,title,description,platform,price,rating,review_count,niche,"
+    "original_url,asin,affiliate_type,gemini_sell_reason"
+)
+
+# Default Pinterest board per access token: {token_hash: (fetched_at, board_id)}
+BOARD_CACHE_TTL = 600
+_board_cache: dict[str, tuple[float, str]] = {}
+
+
+async def _default_board_id(api, token: str):
+    """Return the account's first board id, re-fetching at most every BOARD_CACHE_TTL seconds."""
+    key = hashlib.sha1(token.encode()).hexdigest()[:12]
+    cached = _board_cache.get(key)
+    if cached and time.monotonic() - cached[0] < BOARD_CACHE_TTL:
+        return cached[1]
+    # Only the first board is needed; aclosing ends the pagination generator on return
+    async with aclosing(api.iter_boards()) as boards:
+        async for board in boards:
+            _board_cache[key] = (time.monotonic(), board["id"])
+            return board["id"]
+    return None
+
+
+# published_pins column that stores each platform's post id
+_POST_ID_COLUMNS = {"pinterest": "pinterest_pin_id", "instagram": "instagram_post_id"}
+
+
+async def _post_pinterest(public_url, title, description, hashtag_list, affiliate_url):
+    """Create the pin on Pinterest. Returns (outcome, pinterest_pin_id)."""
+    token = await asyncio.to_thread(get_setting_sync, "pinterest_access_token")
+    if not (token and public_url):
+        return None, None
+    try:
+        api = PinterestAPI(access_token=token)
+        async with _PINTEREST_SEM:
+            board_id = await _default_board_id(api, token)
+            if not board_id:
+                return None, None
+            result = await api.create_pin(
+                board_id=board_id,
+                title=title,
+                description=description + "\n" + " ".join(hashtag_list),
+                link=affiliate_url,
+                media_url=public_url,
+            )
+        return "posted", result.get("id")
+    except Exception as e:
+        logger.error(f"Pinterest post failed: {e}")
+        return f"failed: {str(e)[:50]}", None
+
+
+async def _post_instagram(public_url, title, description, hashtag_list):
+    """Publish the image to Instagram. Returns (outcome, instagram_post_id)."""
+    token = await asyncio.to_thread(get_setting_sync, "instagram_access_token")
+    if not (token and public_url):
+        return None, None
+    try:
+        api = InstagramAPI(access_token=token)
+        async with _INSTAGRAM_SEM:
+            ig_id = await api.get_ig_business_account()
+            if not ig_id:
+                return None, None
+            caption = f"{title}\n\n{description}\n\n{' '.join(hashtag_list)}"
+            result = await api.publish_image(ig_id, public_url, caption)
+        if not result.get("id"):
+            return "failed: no media id returned", None
+        return "posted", result["id"]
+    except Exception as e:
+        logger.error(f"Instagram post failed: {e}")
+        return f"failed: {str(e)[:50]}", None
 
 
 @router.get("/pending")
 async def get_pending_pins(limit: int = Query(10, ge=1, le=50)):
     sb = get_supabase()
-    r = sb.table("published_pins").select("*", count="exact").eq("status", "pending").order("created_at", desc=True).limit(limit).execute()
-    return {"items": r.data or [], "total": r.count or 0}
+    r = await asyncio.to_thread(
+        sb.table("published_pins").select("*").eq("status", "pending").order("created_at", desc=True).limit(limit).execute
+    )
+    return {"items": r.data or []}
 
 
 @router.get("")
@@ -26,16 +110,18 @@ async def list_pins(
     status: str = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(10),
+    with_total: bool = Query(False),
 ):
     sb = get_supabase()
-    q = sb.table("published_pins").select("*", count="exact")
+    # Exact counts cost a second scan; only pay for it when the caller asks
+    q = sb.table("published_pins").select("*", count="exact" if with_total else None)
     if status:
         q = q.eq("status", status)
     q = q.order("created_at", desc=True)
     offset = (page - 1) * per_page
     q = q.range(offset, offset + per_page - 1)
-    r = q.execute()
-    return {"items": r.data or [], "total": r.count or 0}
+    r = await asyncio.to_thread(q.execute)
+    return {"items": r.data or [], "total": r.count if with_total else None}
 
 
 @router.post("/generate-content")
@@ -46,15 +132,15 @@ async def generate_pin_content(data: dict):
         return {"error": "product_id required"}
 
     sb = get_supabase()
-    result = sb.table("products").select("*").eq("id", product_id).execute()
-    if not result.data:
+    result = await asyncio.to_thread(
+        sb.table("products").select(_PIN_PRODUCT_COLUMNS).eq("id", product_id).limit(1).maybe_single().execute
+    )
+    # maybe_single() yields None (not an empty response) when no row matches
+    if not result or not result.data:
         return {"error": "Product not found"}
-    product = result.data[0]
+    product = result.data
 
-    from services.content_generator import generate_pin_content as gen, calculate_best_posting_time
-    from models.database import get_setting_sync
-
-    api_key = get_setting_sync("gemini_api_key")
+    api_key = await asyncio.to_thread(get_setting_sync, "gemini_api_key")
 
     product_dict = {
         "title": product.get("title"),
@@ -65,7 +151,7 @@ async def generate_pin_content(data: dict):
         "review_count": product.get("review_count"),
     }
 
-    content = await gen(
+    content = await generate_content(
         product=product_dict,
         niche=product.get("niche") or "",
         trends_data={},
@@ -91,8 +177,24 @@ async def generate_pin_content(data: dict):
     return content
 
 
-@router.post("/publish")
+def _finalize_pin(pin_id, pin_update: dict, results: dict, title: str):
+    """Write the publish outcome and its evolution_log entry (runs as a background task)."""
+    sb = get_supabase()
+    if pin_id:
+        sb.table("published_pins").update(pin_update).eq("id", pin_id).execute()
+    sb.table("evolution_log").insert({
+        "log_type": "pin_published",
+        "data": orjson.dumps({
+            "message": f"Pin published: {title[:50]}",
+            "pinterest": results["pinterest"],
+            "instagram": results["instagram"],
+        }).decode(),
+    }).execute()
+
+
+@router.post("/publish", status_code=202)
 async def publish_pin(
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(None),
     product_id: str = Form(""),
     title: str = Form(""),
@@ -103,70 +205,46 @@ async def publish_pin(
     post_to_instagram: str = Form("false"),
 ):
     """Publish pin to Pinterest and/or Instagram."""
-    from models.database import get_setting_sync
-
     sb = get_supabase()
 
-    # Save uploaded image + upload to Supabase Storage
-    image_path = None
+    # Upload image straight to Supabase Storage (no local temp file)
     public_url = None
 
     if image and image.filename:
         ext = image.filename.split(".")[-1] if "." in image.filename else "jpg"
-        filename = f"pin_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
-        image_path = str(UPLOAD_DIR / filename)
         file_bytes = await image.read()
-
-        # Save locally temporarily
-        with open(image_path, "wb") as f:
-            f.write(file_bytes)
-
-        # Upload to Supabase Storage (pin-images bucket)
-        try:
-            storage = sb.storage.from_("pin-images")
-            storage.upload(
-                path=filename,
-                file=file_bytes,
-                file_options={"content-type": image.content_type or "image/jpeg"},
-            )
-            # Build public URL
-            project_ref = os.getenv("SUPABASE_URL", "").replace("https://", "").split(".")[0]
-            public_url = f"https://{project_ref}.supabase.co/storage/v1/object/public/pin-images/{filename}"
+        # Content-addressed name: re-publishing the same image reuses the stored object
+        digest = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+        filename = f"pin_{digest}.{ext}"
+        public_url, _ = await upload_pin_image(file_bytes, filename, image.content_type or "image/jpeg")
+        if public_url:
             logger.info(f"Uploaded to Supabase Storage: {public_url}")
-        except Exception as e:
-            logger.warning(f"Supabase Storage upload failed: {e}")
-
-        # Delete local temp file
-        try:
-            os.unlink(image_path)
-        except Exception:
-            pass
 
     # Get product info
     product = None
     if product_id:
-        r = sb.table("products").select("*").eq("id", int(product_id)).execute()
-        product = r.data[0] if r.data else None
+        r = await asyncio.to_thread(
+            sb.table("products").select(_PIN_PRODUCT_COLUMNS).eq("id", int(product_id)).limit(1).maybe_single().execute
+        )
+        product = r.data if r else None
 
     # Generate affiliate link
     affiliate_url = product.get("original_url", "") if product else ""
     if product and product.get("affiliate_type") == "amazon_associates" and product.get("asin"):
-        from services.affiliate_manager import generate_amazon_affiliate_link_sync
-        link = generate_amazon_affiliate_link_sync(product["asin"])
+        link = await asyncio.to_thread(generate_amazon_affiliate_link_sync, product["asin"])
         affiliate_url = link or affiliate_url
     elif product:
-        from services.affiliate_manager import generate_cuelinks_link_sync
-        link = generate_cuelinks_link_sync(product.get("original_url", ""))
+        link = await generate_cuelinks_link(product.get("original_url", ""))
         affiliate_url = link or affiliate_url
 
     # Parse hashtags/keywords
     try:
-        hashtag_list = json.loads(hashtags) if hashtags else []
-    except json.JSONDecodeError:
+        hashtag_list = orjson.loads(hashtags) if hashtags else []
+    except orjson.JSONDecodeError:
         hashtag_list = []
     try:
-        keyword_list = json.loads(keywords) if keywords else []
-    except json.JSONDecodeError:
+        keyword_list = orjson.loads(keywords) if keywords else []
+    except orjson.JSONDecodeError:
         keyword_list = []
 
     # Create pin record
@@ -175,78 +253,41 @@ async def publish_pin(
         "niche": product.get("niche") if product else None,
         "title": title,
         "description": description,
-        "hashtags": json.dumps(hashtag_list),
-        "seo_keywords": json.dumps(keyword_list),
+        "hashtags": orjson.dumps(hashtag_list).decode(),
+        "seo_keywords": orjson.dumps(keyword_list).decode(),
         "pin_image_local_path": None,
         "pin_image_cloudinary_url": public_url,  # Supabase Storage URL stored here
         "affiliate_link": affiliate_url,
         "affiliate_type": product.get("affiliate_type") if product else None,
         "status": "pending",
     }
-    r = sb.table("published_pins").insert(pin_data).execute()
+    r = await asyncio.to_thread(sb.table("published_pins").insert(pin_data).execute)
     pin_id = r.data[0]["id"] if r.data else None
 
     results = {"pinterest": None, "instagram": None}
+    # Platform ids collected here land in the single status update below
+    pin_update = {}
 
-    # Post to Pinterest
+    # Post to both platforms concurrently
+    posts = {}
     if post_to_pinterest == "true":
-        token = get_setting_sync("pinterest_access_token")
-        if token and public_url:
-            from services.pinterest_api import PinterestAPI
-            try:
-                api = PinterestAPI(access_token=token)
-                boards = await api.get_boards()
-                if boards:
-                    board_id = boards[0]["id"]
-                    result = await api.create_pin(
-                        board_id=board_id,
-                        title=title,
-                        description=description + "\n" + " ".join(hashtag_list),
-                        link=affiliate_url,
-                        media_url=public_url,
-                    )
-                    if pin_id:
-                        sb.table("published_pins").update({"pinterest_pin_id": result.get("id")}).eq("id", pin_id).execute()
-                    results["pinterest"] = "posted"
-            except Exception as e:
-                logger.error(f"Pinterest post failed: {e}")
-                results["pinterest"] = f"failed: {str(e)[:50]}"
-
-    # Post to Instagram
+        posts["pinterest"] = _post_pinterest(public_url, title, description, hashtag_list, affiliate_url)
     if post_to_instagram == "true":
-        token = get_setting_sync("instagram_access_token")
-        if token and public_url:
-            from services.instagram_api import InstagramAPI
-            try:
-                api = InstagramAPI(access_token=token)
-                ig_id = await api.get_ig_business_account()
-                if ig_id:
-                    caption = f"{title}\n\n{description}\n\n{' '.join(hashtag_list)}"
-                    result = await api.publish_image(ig_id, public_url, caption)
-                    if pin_id:
-                        sb.table("published_pins").update({"instagram_post_id": result.get("id")}).eq("id", pin_id).execute()
-                    results["instagram"] = "posted"
-            except Exception as e:
-                logger.error(f"Instagram post failed: {e}")
-                results["instagram"] = f"failed: {str(e)[:50]}"
+        posts["instagram"] = _post_instagram(public_url, title, description, hashtag_list)
+    outcomes = await asyncio.gather(*posts.values())
+    for platform, (outcome, post_id) in zip(posts, outcomes):
+        results[platform] = outcome
+        if post_id is not None:
+            pin_update[_POST_ID_COLUMNS[platform]] = post_id
 
     # Update pin status
     status = "posted" if results["pinterest"] == "posted" or results["instagram"] == "posted" else "pending"
-    update_data = {"status": status}
+    pin_update["status"] = status
     if status == "posted":
-        update_data["posted_at"] = datetime.now(timezone.utc).isoformat()
-    if pin_id:
-        sb.table("published_pins").update(update_data).eq("id", pin_id).execute()
+        pin_update["posted_at"] = datetime.now(timezone.utc).isoformat()
 
-    # Log evolution event
-    sb.table("evolution_log").insert({
-        "log_type": "pin_published",
-        "data": json.dumps({
-            "message": f"Pin published: {title[:50]}",
-            "pinterest": results["pinterest"],
-            "instagram": results["instagram"],
-        }),
-    }).execute()
+    # Persist the outcome after the response is sent
+    background_tasks.add_task(_finalize_pin, pin_id, pin_update, results, title)
 
     return {
         "ok": True,
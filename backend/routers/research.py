@@ -1,31 +1,67 @@
 import asyncio
-import json
 import logging
+import orjson
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 from datetime import datetime, timezone
 from services.supabase_client import get_supabase
+from services.affiliate_manager import determine_affiliate_type
+from services.evolution_engine import log_research_complete
+from services.scraper import scrape_all_platforms
+from services.trend_detector import analyze_google_trends, detect_realtime_events, scrape_pinterest_trends
 from models.schemas import ResearchStartRequest, ResearchSessionOut
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+INSERT_BATCH_SIZE = 500
+
+
+def _dumps(obj) -> str:
+    """orjson encode to str; trends data can carry numpy scalars and non-str keys."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+
+# Caps outbound scraping jobs across all concurrent research sessions
+_SCRAPE_SEM = asyncio.Semaphore(8)
+
+
+async def _limited(fn, *args):
+    """Run a scrape once a scrape slot is free (blocking ones in a thread)."""
+    async with _SCRAPE_SEM:
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
 # Import WebSocket manager from main lazily to avoid circular imports
-def _get_ws_connections():
-    from main import research_ws_connections
-    return research_ws_connections
+def _get_ws_queues():
+    from main import research_ws_queues
+    return research_ws_queues
 
 
 async def broadcast_progress(session_id: int, payload: dict):
-    """Send progress update to all connected WebSocket clients."""
-    connections = _get_ws_connections().get(session_id, [])
-    dead = []
-    for ws in connections:
+    """Queue a progress update for every WebSocket subscribed to the session."""
+    queues = _get_ws_queues().get(session_id)
+    if not queues:
+        return
+    # Encode once; each socket's handler sends the same text frame
+    message = _dumps(payload)
+    terminal = "status" in payload  # completed / failed — the client must see it
+    for queue in queues:
         try:
-            await ws.send_text(json.dumps(payload))
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        connections.remove(ws)
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client — drop progress ticks, but evict the oldest for a final status
+            if terminal:
+                queue.get_nowait()
+                queue.put_nowait(message)
+
+
+def close_progress(session_id: int):
+    """Release WebSocket clients once a session has sent its final update."""
+    for queue in _get_ws_queues().get(session_id, ()):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
 
 
 @router.post("/start")
@@ -36,17 +72,17 @@ async def start_research(
     sb = get_supabase()
 
     # Create session record
-    result = sb.table("research_sessions").insert({
+    result = await asyncio.to_thread(sb.table("research_sessions").insert({
         "niche": req.niche,
         "status": "running",
-    }).execute()
+    }).execute)
     session_id = result.data[0]["id"]
 
     # Log action
-    sb.table("evolution_log").insert({
+    await asyncio.to_thread(sb.table("evolution_log").insert({
         "log_type": "research_started",
-        "data": json.dumps({"message": f"Research started: {req.niche}", "niche": req.niche}),
-    }).execute()
+        "data": _dumps({"message": f"Research started: {req.niche}", "niche": req.niche}),
+    }).execute)
 
     # Run research in background
     background_tasks.add_task(run_full_research, session_id, req.niche)
@@ -57,7 +93,9 @@ async def start_research(
 @router.get("/sessions")
 async def list_sessions():
     sb = get_supabase()
-    result = sb.table("research_sessions").select("id,niche,status,products_found,started_at,completed_at").order("started_at", desc=True).limit(20).execute()
+    result = await asyncio.to_thread(
+        sb.table("research_sessions").select("id,niche,status,products_found,started_at,completed_at").order("started_at", desc=True).limit(20).execute
+    )
     items = []
     for row in result.data or []:
         items.append({
@@ -74,18 +112,42 @@ async def list_sessions():
 @router.get("/sessions/{session_id}")
 async def get_session(session_id: int):
     sb = get_supabase()
-    result = sb.table("research_sessions").select("*").eq("id", session_id).execute()
-    if not result.data:
+    # Alias id -> session_id server-side and skip the large trends/events JSON columns
+    result = await asyncio.to_thread(
+        sb.table("research_sessions")
+        .select("session_id:id,niche,status,products_found,started_at,completed_at")
+        .eq("id", session_id)
+        .limit(1)
+        .maybe_single()
+        .execute
+    )
+    if not result or not result.data:
         raise HTTPException(status_code=404, detail="Session not found")
-    row = result.data[0]
-    return {
-        "session_id": row["id"],
-        "niche": row["niche"],
-        "status": row["status"],
-        "products_found": row.get("products_found", 0),
-        "started_at": row.get("started_at"),
-        "completed_at": row.get("completed_at"),
-    }
+    return result.data
+
+
+def _save_research(sb, session_id: int, niche: str, rows: list, trends_data, events_data, pinterest_data):
+    """Write products, the session record and the evolution log entry (blocking)."""
+    # Bulk insert — one round trip per batch instead of one per product
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        sb.table("products").insert(rows[i:i + INSERT_BATCH_SIZE]).execute()
+    saved = len(rows)
+
+    # Update session record
+    sb.table("research_sessions").update({
+        "status": "completed",
+        "products_found": saved,
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "google_trends_data": _dumps(trends_data),
+        "real_time_events": _dumps(events_data),
+        "pinterest_trends": _dumps(pinterest_data),
+    }).eq("id", session_id).execute()
+
+    # Log completion
+    sb.table("evolution_log").insert({
+        "log_type": "research_completed",
+        "data": _dumps({"message": f"Research done: {niche} — {saved} products", "niche": niche, "count": saved}),
+    }).execute()
 
 
 # ──────────────────────────────────────────────────────────────
@@ -96,34 +158,25 @@ async def run_full_research(session_id: int, niche: str):
     Full research pipeline — 8 steps.
     Runs in background — broadcasts progress via WebSocket.
     """
-    from services.trend_detector import analyze_google_trends, detect_realtime_events, scrape_pinterest_trends
-    from services.scraper import scrape_all_platforms
-    from services.affiliate_manager import determine_affiliate_type
-    from services.evolution_engine import log_research_complete
-
     sb = get_supabase()
 
     async def update(step: str, pct: int, extra: dict = {}):
         await broadcast_progress(session_id, {"step": step, "progress": pct, **extra})
 
     try:
-        # STEP 1 — Google Trends
-        await update("Analyzing Google Trends for your niche...", 5)
-        trends_data = await asyncio.to_thread(analyze_google_trends, niche)
-
-        # STEP 2 — Real-time events
-        await update("Detecting real-time events and trends in India...", 15)
-        events_data = await asyncio.to_thread(detect_realtime_events, niche)
-
-        # STEP 3 — Pinterest trends
-        await update("Scraping Pinterest trends for your niche...", 25)
-        pinterest_data = await asyncio.to_thread(scrape_pinterest_trends, niche)
+        # STEPS 1-3 — Google Trends, real-time events, Pinterest trends (independent, run together)
+        await update("Analyzing Google Trends, real-time events and Pinterest trends...", 5)
+        trends_data, events_data, pinterest_data = await asyncio.gather(
+            _limited(analyze_google_trends, niche),
+            _limited(detect_realtime_events, niche),
+            _limited(scrape_pinterest_trends, niche),
+        )
+        await update("Trend analysis complete.", 25)
 
         # STEP 4 — Scrape products from all relevant platforms
         await update("Finding products across Amazon, Flipkart, Myntra, Meesho...", 35)
-        raw_products = await asyncio.to_thread(
-            scrape_all_platforms, niche, trends_data, events_data, pinterest_data
-        )
+        async with _SCRAPE_SEM:
+            raw_products = await scrape_all_platforms(niche, trends_data, events_data, pinterest_data)
 
         # STEP 5 — Competitor analysis
         await update("Running competitor analysis on Pinterest...", 60)
@@ -136,60 +189,49 @@ async def run_full_research(session_id: int, niche: str):
 
         # STEP 8 — Save to DB
         await update("Saving results to database...", 92)
-        saved = 0
-        for p in raw_products:
-            sb.table("products").insert({
-                "title": p.get("title", ""),
-                "platform": p.get("platform", ""),
-                "original_url": p.get("url", ""),
-                "price": p.get("price"),
-                "mrp": p.get("mrp"),
-                "discount_pct": p.get("discount_pct"),
-                "rating": p.get("rating"),
-                "review_count": p.get("review_count"),
-                "asin": p.get("asin"),
-                "image_url": p.get("image_url"),
-                "additional_images": json.dumps(p.get("additional_images", [])),
-                "description": p.get("description"),
-                "feature_bullets": json.dumps(p.get("feature_bullets", [])),
-                "niche": niche,
-                "score": p.get("score"),
-                "trend_bonus": p.get("trend_bonus"),
-                "commission_estimate": p.get("commission_estimate"),
-                "affiliate_type": determine_affiliate_type(p.get("platform", "")),
-                "stock_status": p.get("stock_status"),
-                "badges": json.dumps(p.get("badges", {})),
-                "gemini_sell_reason": p.get("gemini_sell_reason"),
-                "research_session_id": session_id,
-            }).execute()
-            saved += 1
-
-        # Update session record
-        sb.table("research_sessions").update({
-            "status": "completed",
-            "products_found": saved,
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-            "google_trends_data": json.dumps(trends_data),
-            "real_time_events": json.dumps(events_data),
-            "pinterest_trends": json.dumps(pinterest_data),
-        }).eq("id", session_id).execute()
-
-        # Log completion
-        sb.table("evolution_log").insert({
-            "log_type": "research_completed",
-            "data": json.dumps({"message": f"Research done: {niche} — {saved} products", "niche": niche, "count": saved}),
-        }).execute()
+        rows = [{
+            "title": p.get("title", ""),
+            "platform": p.get("platform", ""),
+            "original_url": p.get("url", ""),
+            "price": p.get("price"),
+            "mrp": p.get("mrp"),
+            "discount_pct": p.get("discount_pct"),
+            "rating": p.get("rating"),
+            "review_count": p.get("review_count"),
+            "asin": p.get("asin"),
+            "image_url": p.get("image_url"),
+            "additional_images": _dumps(p.get("additional_images", [])),
+            "description": p.get("description"),
+            "feature_bullets": _dumps(p.get("feature_bullets", [])),
+            "niche": niche,
+            "score": p.get("score"),
+            "trend_bonus": p.get("trend_bonus"),
+            "commission_estimate": p.get("commission_estimate"),
+            "affiliate_type": determine_affiliate_type(p.get("platform", "")),
+            "stock_status": p.get("stock_status"),
+            "badges": _dumps(p.get("badges", {})),
+            "gemini_sell_reason": p.get("gemini_sell_reason"),
+            "research_session_id": session_id,
+        } for p in raw_products]
+
+        await asyncio.to_thread(
+            _save_research, sb, session_id, niche, rows, trends_data, events_data, pinterest_data
+        )
+        saved = len(rows)
 
         await update("Research complete!", 100, {"status": "completed", "products_found": saved})
+        close_progress(session_id)
         await log_research_complete(niche, saved)
 
     except Exception as e:
         logger.exception(f"Research failed for session {session_id}: {e}")
         try:
-            sb.table("research_sessions").update({
-                "status": "failed",
-                "error_log": str(e),
-            }).eq("id", session_id).execute()
+            await asyncio.to_thread(
+                sb.table("research_sessions").update({
+                    "status": "failed",
+                    "error_log": str(e),
+                }).eq("id", session_id).execute
+            )
         except Exception:
             pass
         await broadcast_progress(session_id, {
@@ -197,3 +239,4 @@ async def run_full_research(session_id: int, niche: str):
             "error": "Research failed. Please try again.",
             "progress": 0,
         })
+        close_progress(session_id)
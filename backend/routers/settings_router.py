@@ -3,10 +3,19 @@ Settings router — save/load API keys in Supabase, test connections, OAuth flow
 """
 import os
 import json
+import asyncio
 import logging
+from datetime import datetime, timezone
 from fastapi import APIRouter, Query, Request
 from fastapi.responses import RedirectResponse
-from services.supabase_client import get_supabase
+from services import instagram_api, pinterest_api
+from services.affiliate_manager import test_amazon_connection_sync
+from services.email_service import send_email, _base_template
+from services.supabase_client import get_supabase, test_connection as test_supabase_connection
+from services.http_client import get_http_client
+from services.content_generator import _gemini_model_for
+from services.token_manager import get_system_health, _check_gmail_login
+from models.database import get_setting_sync, get_settings_sync, cache_settings
 from models.schemas import SettingsIn, TestConnectionOut
 
 logger = logging.getLogger(__name__)
@@ -21,26 +30,24 @@ MASKED_KEYS = {
 
 
 def _get_setting(key: str) -> str | None:
-    """Get setting from Supabase."""
-    try:
-        sb = get_supabase()
-        r = sb.table("settings").select("value").eq("key", key).execute()
-        if r.data:
-            return r.data[0]["value"]
-    except Exception:
-        pass
-    return None
+    """Get setting from Supabase (TTL-cached in models.database)."""
+    return get_setting_sync(key)
+
+
+def _get_settings_bulk(keys: list[str]) -> dict[str, str]:
+    """Get several settings in one query (cache misses only)."""
+    return get_settings_sync(keys)
 
 
 def _set_setting(key: str, value: str):
     """Upsert setting in Supabase."""
-    from datetime import datetime, timezone
     sb = get_supabase()
     sb.table("settings").upsert({
         "key": key,
         "value": value,
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }).execute()
+    cache_settings({key: value})
 
 
 # ── System Health ─────────────────────────────
@@ -48,8 +55,7 @@ def _set_setting(key: str, value: str):
 @router.get("/health")
 async def system_health():
     """Return health status for all 8 services (includes Supabase)."""
-    from services.token_manager import get_system_health
-    return get_system_health()
+    return await get_system_health()
 
 
 # ── GET / POST Settings ──────────────────────
@@ -73,7 +79,7 @@ async def get_settings():
             return "••••••••"
         return val
 
-    result = sb.table("settings").select("key,value,updated_at").execute()
+    result = await asyncio.to_thread(sb.table("settings").select("key,value,updated_at").in_("key", all_keys).execute)
     db_map = {row["key"]: row for row in result.data or []}
 
     settings = {}
@@ -89,9 +95,16 @@ async def get_settings():
 @router.post("")
 async def save_settings(data: SettingsIn):
     raw = data.model_dump()
-    for key, val in raw.items():
-        if val and val != "••••••••":
-            _set_setting(key, val)
+    now_iso = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"key": key, "value": val, "updated_at": now_iso}
+        for key, val in raw.items()
+        if val and val != "••••••••"
+    ]
+    if rows:
+        sb = get_supabase()
+        await asyncio.to_thread(sb.table("settings").upsert(rows, on_conflict="key").execute)
+        cache_settings({row["key"]: row["value"] for row in rows})
 
     return {"ok": True, "message": "Settings saved successfully."}
 
@@ -100,14 +113,13 @@ async def save_settings(data: SettingsIn):
 @router.get("/oauth/pinterest/url")
 async def pinterest_oauth_url(request: Request):
     """Generate Pinterest OAuth authorization URL."""
-    from services.pinterest_api import get_oauth_url
-    app_id = _get_setting("pinterest_app_id")
+    app_id = await asyncio.to_thread(_get_setting, "pinterest_app_id")
     if not app_id:
         return {"ok": False, "message": "Pinterest App ID not set. Save it first."}
 
     base_url = str(request.base_url).rstrip("/")
     redirect_uri = f"{base_url}/api/settings/oauth/pinterest/callback"
-    url = get_oauth_url(app_id, redirect_uri)
+    url = pinterest_api.get_oauth_url(app_id, redirect_uri)
     return {"ok": True, "url": url}
 
 
@@ -122,17 +134,16 @@ async def pinterest_oauth_callback(
     if error or not code:
         return RedirectResponse(url="/settings?oauth=pinterest&status=failed")
 
-    from services.pinterest_api import exchange_code_for_token
-    app_id = _get_setting("pinterest_app_id")
-    app_secret = _get_setting("pinterest_app_secret")
+    cfg = await asyncio.to_thread(_get_settings_bulk, ["pinterest_app_id", "pinterest_app_secret"])
+    app_id, app_secret = cfg.get("pinterest_app_id"), cfg.get("pinterest_app_secret")
     base_url = str(request.base_url).rstrip("/")
     redirect_uri = f"{base_url}/api/settings/oauth/pinterest/callback"
 
     try:
-        token_data = await exchange_code_for_token(code, app_id, app_secret, redirect_uri)
+        token_data = await pinterest_api.exchange_code_for_token(code, app_id, app_secret, redirect_uri)
         access_token = token_data.get("access_token", "")
         if access_token:
-            _set_setting("pinterest_access_token", access_token)
+            await asyncio.to_thread(_set_setting, "pinterest_access_token", access_token)
             return RedirectResponse(url="/settings?oauth=pinterest&status=success")
         return RedirectResponse(url="/settings?oauth=pinterest&status=failed")
     except Exception as e:
@@ -144,14 +155,13 @@ async def pinterest_oauth_callback(
 @router.get("/oauth/instagram/url")
 async def instagram_oauth_url(request: Request):
     """Generate Instagram/Facebook OAuth authorization URL."""
-    from services.instagram_api import get_oauth_url
-    app_id = _get_setting("instagram_app_id")
+    app_id = await asyncio.to_thread(_get_setting, "instagram_app_id")
     if not app_id:
         return {"ok": False, "message": "Instagram App ID not set. Save it first."}
 
     base_url = str(request.base_url).rstrip("/")
     redirect_uri = f"{base_url}/api/settings/oauth/instagram/callback"
-    url = get_oauth_url(app_id, redirect_uri)
+    url = instagram_api.get_oauth_url(app_id, redirect_uri)
     return {"ok": True, "url": url}
 
 
@@ -165,17 +175,16 @@ async def instagram_oauth_callback(
     if error or not code:
         return RedirectResponse(url="/settings?oauth=instagram&status=failed")
 
-    from services.instagram_api import exchange_code_for_token
-    app_id = _get_setting("instagram_app_id")
-    app_secret = _get_setting("instagram_app_secret")
+    cfg = await asyncio.to_thread(_get_settings_bulk, ["instagram_app_id", "instagram_app_secret"])
+    app_id, app_secret = cfg.get("instagram_app_id"), cfg.get("instagram_app_secret")
     base_url = str(request.base_url).rstrip("/")
     redirect_uri = f"{base_url}/api/settings/oauth/instagram/callback"
 
     try:
-        token_data = await exchange_code_for_token(code, app_id, app_secret, redirect_uri)
+        token_data = await instagram_api.exchange_code_for_token(code, app_id, app_secret, redirect_uri)
         access_token = token_data.get("access_token", "")
         if access_token:
-            _set_setting("instagram_access_token", access_token)
+            await asyncio.to_thread(_set_setting, "instagram_access_token", access_token)
             return RedirectResponse(url="/settings?oauth=instagram&status=success")
         return RedirectResponse(url="/settings?oauth=instagram&status=failed")
     except Exception as e:
@@ -187,14 +196,14 @@ async def instagram_oauth_callback(
 @router.post("/test-email")
 async def send_test_email():
     """Send a test email to verify Gmail SMTP works."""
-    gmail = _get_setting("gmail_address")
-    pwd = _get_setting("gmail_app_password")
-    to = _get_setting("notification_email") or gmail
+    cfg = await asyncio.to_thread(_get_settings_bulk, ["gmail_address", "gmail_app_password", "notification_email"])
+    gmail = cfg.get("gmail_address")
+    pwd = cfg.get("gmail_app_password")
+    to = cfg.get("notification_email") or gmail
 
     if not gmail or not pwd:
         return {"ok": False, "message": "Gmail credentials not set."}
 
-    from services.email_service import send_email, _base_template
     try:
         ok = await send_email(
             gmail, pwd, to,
@@ -215,13 +224,12 @@ async def send_test_email():
 @router.get("/pinterest/boards")
 async def get_pinterest_boards():
     """Get user's Pinterest boards for the board selector."""
-    token = _get_setting("pinterest_access_token")
+    token = await asyncio.to_thread(_get_setting, "pinterest_access_token")
     if not token:
         return {"ok": False, "boards": [], "message": "Pinterest not connected."}
 
-    from services.pinterest_api import PinterestAPI
     try:
-        api = PinterestAPI(access_token=token)
+        api = pinterest_api.PinterestAPI(access_token=token)
         boards = await api.get_boards()
         return {"ok": True, "boards": boards}
     except Exception as e:
@@ -233,67 +241,60 @@ async def get_pinterest_boards():
 async def test_connection(service: str):
     try:
         if service == "gemini":
-            import google.generativeai as genai
-            key = _get_setting("gemini_api_key")
+            key = await asyncio.to_thread(_get_setting, "gemini_api_key")
             if not key:
                 return TestConnectionOut(ok=False, message="Gemini API key not set.")
-            genai.configure(api_key=key)
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            resp = model.generate_content("Say: PinProfit connected!")
+            model = _gemini_model_for(key)  # configured once per key, shared with content generation
+            resp = await asyncio.to_thread(model.generate_content, "Say: PinProfit connected!")
             if resp.text:
                 return TestConnectionOut(ok=True, message="Gemini AI connected successfully!")
             return TestConnectionOut(ok=False, message="Gemini responded but with empty content.")
 
         elif service == "supabase":
-            from services.supabase_client import test_connection as test_sb
-            ok, msg = test_sb()
+            ok, msg = await asyncio.to_thread(test_supabase_connection)
             return TestConnectionOut(ok=ok, message=msg)
 
         elif service == "email":
-            import smtplib
-            gmail = _get_setting("gmail_address")
-            pwd   = _get_setting("gmail_app_password")
+            cfg = await asyncio.to_thread(_get_settings_bulk, ["gmail_address", "gmail_app_password"])
+            gmail = cfg.get("gmail_address")
+            pwd   = cfg.get("gmail_app_password")
             if not gmail or not pwd:
                 return TestConnectionOut(ok=False, message="Gmail credentials not set.")
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as s:
-                s.login(gmail, pwd)
+            await _check_gmail_login(gmail, pwd)
             return TestConnectionOut(ok=True, message="Gmail SMTP connected!")
 
         elif service == "pinterest":
-            import httpx
-            token = _get_setting("pinterest_access_token")
+            token = await asyncio.to_thread(_get_setting, "pinterest_access_token")
             if not token:
                 return TestConnectionOut(ok=False, message="Pinterest access token not set. Use 'Connect Pinterest' button.")
-            r = httpx.get("https://api.pinterest.com/v5/user_account",
-                          headers={"Authorization": f"Bearer {token}"})
+            r = await get_http_client().get("https://api.pinterest.com/v5/user_account",
+                                            headers={"Authorization": f"Bearer {token}"}, timeout=10)
             if r.status_code == 200:
                 data = r.json()
                 return TestConnectionOut(ok=True, message=f"Pinterest connected as @{data.get('username', 'unknown')}")
             return TestConnectionOut(ok=False, message=f"Pinterest API error: {r.status_code}")
 
         elif service == "instagram":
-            import httpx
-            token = _get_setting("instagram_access_token")
+            token = await asyncio.to_thread(_get_setting, "instagram_access_token")
             if not token:
                 return TestConnectionOut(ok=False, message="Instagram access token not set. Use 'Connect Instagram' button.")
-            r = httpx.get(f"https://graph.instagram.com/me?fields=id,username&access_token={token}")
+            r = await get_http_client().get(f"https://graph.instagram.com/me?fields=id,username&access_token={token}",
+                                            timeout=10)
             if r.status_code == 200:
                 data = r.json()
                 return TestConnectionOut(ok=True, message=f"Instagram connected as @{data.get('username', 'unknown')}")
             return TestConnectionOut(ok=False, message=f"Instagram API error: {r.status_code}")
 
         elif service == "amazon":
-            from services.affiliate_manager import test_amazon_connection_sync
-            ok, msg = test_amazon_connection_sync()
+            ok, msg = await asyncio.to_thread(test_amazon_connection_sync)
             return TestConnectionOut(ok=ok, message=msg)
 
         elif service == "cuelinks":
-            import httpx
-            key = _get_setting("cuelinks_api_key")
+            key = await asyncio.to_thread(_get_setting, "cuelinks_api_key")
             if not key:
                 return TestConnectionOut(ok=False, message="Cuelinks API key not set.")
-            r = httpx.get("https://api.cuelinks.com/v1/publisher/profile",
-                          headers={"Authorization": f"Bearer {key}"})
+            r = await get_http_client().get("https://api.cuelinks.com/v1/publisher/profile",
+                                            headers={"Authorization": f"Bearer {key}"}, timeout=10)
             if r.status_code == 200:
                 return TestConnectionOut(ok=True, message="Cuelinks API connected!")
             return TestConnectionOut(ok=False, message=f"Cuelinks API error: {r.status_code}")
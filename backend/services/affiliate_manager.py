@@ -4,9 +4,10 @@ Routes products to correct affiliate system:
 - Amazon products → Amazon PA-API 5.0
 - All others → Cuelinks API
 """
+import asyncio
 import logging
-import httpx
-from sqlalchemy.ext.asyncio import AsyncSession
+from models.database import get_setting_sync, get_settings_sync
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,55 +22,51 @@ def determine_affiliate_type(platform: str) -> str:
     return "cuelinks"
 
 
-async def generate_amazon_affiliate_link(asin: str, db: AsyncSession) -> tuple[str | None, str]:
+def _amazon_credentials() -> tuple[str | None, str | None, str | None]:
+    """Access key, secret and associate tag in one (TTL-cached) settings lookup."""
+    cfg = get_settings_sync(["amazon_access_key", "amazon_secret_key", "amazon_associate_tag"])
+    return cfg.get("amazon_access_key"), cfg.get("amazon_secret_key"), cfg.get("amazon_associate_tag")
+
+
+def generate_amazon_affiliate_link_sync(asin: str) -> str | None:
     """Generate affiliate link via Amazon PA-API 5.0."""
-    from routers.settings_router import _get_setting
-    access_key = await _get_setting(db, "amazon_access_key")
-    secret_key = await _get_setting(db, "amazon_secret_key")
-    associate_tag = await _get_setting(db, "amazon_associate_tag")
+    access_key, secret_key, associate_tag = _amazon_credentials()
 
     if not all([access_key, secret_key, associate_tag, asin]):
-        return None, "Amazon credentials or ASIN missing"
+        logger.warning("Amazon credentials or ASIN missing")
+        return None
 
-    try:
-        # Construct direct affiliate URL (works without PA-API for basic links)
-        affiliate_url = f"https://www.amazon.in/dp/{asin}?tag={associate_tag}"
-        return affiliate_url, "ok"
-    except Exception as e:
-        logger.error(f"Amazon affiliate link failed: {e}")
-        return None, str(e)
+    # Direct affiliate URL (works without PA-API for basic links)
+    return f"https://www.amazon.in/dp/{asin}?tag={associate_tag}"
 
 
-async def generate_cuelinks_link(original_url: str, db: AsyncSession) -> tuple[str | None, str]:
+async def generate_cuelinks_link(original_url: str) -> str | None:
     """Convert URL to Cuelinks affiliate link."""
-    from routers.settings_router import _get_setting
-    api_key = await _get_setting(db, "cuelinks_api_key")
+    api_key = await asyncio.to_thread(get_setting_sync, "cuelinks_api_key")
 
     if not api_key:
-        return None, "Cuelinks API key not set"
+        logger.warning("Cuelinks API key not set")
+        return None
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.post(
-                "https://api.cuelinks.com/v1/cplink",
-                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                json={"URL": original_url},
-            )
-            if r.status_code == 200:
-                data = r.json()
-                return data.get("cuelink") or data.get("link"), "ok"
-            return None, f"Cuelinks API error: {r.status_code}"
+        r = await get_http_client().post(
+            "https://api.cuelinks.com/v1/cplink",
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json={"URL": original_url},
+        )
+        if r.status_code == 200:
+            data = r.json()
+            return data.get("cuelink") or data.get("link")
+        logger.warning(f"Cuelinks API error: {r.status_code}")
+        return None
     except Exception as e:
         logger.error(f"Cuelinks link generation failed: {e}")
-        return None, str(e)
+        return None
 
 
-async def test_amazon_connection(db: AsyncSession) -> tuple[bool, str]:
+def test_amazon_connection_sync() -> tuple[bool, str]:
     """Test Amazon PA-API connection."""
-    from routers.settings_router import _get_setting
-    key = await _get_setting(db, "amazon_access_key")
-    secret = await _get_setting(db, "amazon_secret_key")
-    tag = await _get_setting(db, "amazon_associate_tag")
+    key, secret, tag = _amazon_credentials()
 
     if not all([key, secret, tag]):
         return False, "Amazon PA-API credentials incomplete. Fill in Access Key, Secret Key, and Associate Tag."
@@ -4,22 +4,62 @@ Uses Google Gemini AI to generate pin titles, descriptions,
 SEO keywords, hashtags, topic tags, and best posting times.
 All content is niche-specific and trend-aware.
 """
+import asyncio
+import functools
+import hashlib
 import logging
 import os
+import re
+import time
 from datetime import datetime, timezone
+from types import MappingProxyType
+from aiolimiter import AsyncLimiter
 
 logger = logging.getLogger(__name__)
 
+# Stay under Gemini's per-minute request quota instead of tripping 429s
+GEMINI_REQUESTS_PER_MINUTE = 60
+_GEMINI_LIMITER = AsyncLimiter(GEMINI_REQUESTS_PER_MINUTE, 60)
+
 
 def _get_gemini_model(api_key: str = None):
-    import google.generativeai as genai
     key = api_key or os.getenv("GEMINI_API_KEY", "")
     if not key:
         raise ValueError("Gemini API key not set")
+    return _gemini_model_for(key)
+
+
+@functools.lru_cache(maxsize=4)
+def _gemini_model_for(key: str):
+    """Configure genai and build the model once per API key."""
+    import google.generativeai as genai
     genai.configure(api_key=key)
     return genai.GenerativeModel("gemini-1.5-flash")
 
 
+# Generated content cache: {key: (stored_at, content)}. Exact prompts are
+# reused for an hour; the same product+niche with different trends for 15 min.
+CONTENT_CACHE_TTL = 3600
+CONTENT_NEAR_CACHE_TTL = 900
+CONTENT_CACHE_MAX = 2048
+_content_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _cache_get(key: str, ttl: float) -> dict | None:
+    entry = _content_cache.get(key)
+    if entry and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    return None
+
+
+def _cache_put(key: str, content: dict):
+    _content_cache.pop(key, None)
+    if len(_content_cache) >= CONTENT_CACHE_MAX:
+        # Dicts keep insertion order, so the first key is the oldest entry
+        del _content_cache[next(iter(_content_cache))]
+    _content_cache[key] = (time.monotonic(), content)
+
+
 async def generate_pin_content(
     product: dict,
     niche: str,
@@ -32,11 +72,6 @@ async def generate_pin_content(
     Generate complete pin content using Gemini AI.
     Returns: title, description, keywords, hashtags, topic_tags, posting_time
     """
-    try:
-        model = _get_gemini_model(api_key)
-    except ValueError as e:
-        return {"error": str(e)}
-
     trending_topics = events_data.get("trending_topics", [])
     rising_queries  = list(trends_data.get("rising_queries", {}).values())[:3]
 
@@ -75,18 +110,41 @@ HASHTAGS: [#tag1 #tag2 ...]
 TOPIC_TAGS: [topic1, topic2, topic3, topic4]
 SELL_REASON: [one sentence reason]"""
 
+    prompt_key = hashlib.sha256(prompt.encode()).hexdigest()
+    near_key = f"{product.get('platform', '')}|{product.get('title', '')}|{niche}"
+    cached = _cache_get(prompt_key, CONTENT_CACHE_TTL) or _cache_get(near_key, CONTENT_NEAR_CACHE_TTL)
+    if cached:
+        return dict(cached)
+
+    try:
+        model = _get_gemini_model(api_key)
+    except ValueError as e:
+        return {"error": str(e)}
+
     try:
-        response = model.generate_content(prompt)
+        async with _GEMINI_LIMITER:
+            response = await asyncio.to_thread(model.generate_content, prompt)
         text = response.text
-        return _parse_content_response(text, product)
+        result = _parse_content_response(text, product)
+        _cache_put(prompt_key, result)
+        _cache_put(near_key, result)
+        return dict(result)
     except Exception as e:
         logger.error(f"Gemini content generation failed: {e}")
         return {"error": f"Content generation failed: {str(e)}"}
 
 
+# One pass over the Gemini reply: "FIELD: value" at the start of any line
+_FIELD_RE = re.compile(r"^(TITLE|DESCRIPTION|SEO_KEYWORDS|HASHTAGS|TOPIC_TAGS|SELL_REASON):(.*)$", re.MULTILINE)
+_COMMA_RE = re.compile(r"\s*,\s*")
+
+
+def _split_commas(value: str) -> list[str]:
+    return [v for v in _COMMA_RE.split(value) if v]
+
+
 def _parse_content_response(text: str, product: dict) -> dict:
     """Parse Gemini response into structured content dict."""
-    lines = text.strip().split("\n")
     result = {
         "title": "",
         "description": "",
@@ -96,22 +154,16 @@ def _parse_content_response(text: str, product: dict) -> dict:
         "sell_reason": "",
     }
 
-    for line in lines:
-        if line.startswith("TITLE:"):
-            result["title"] = line[6:].strip()
-        elif line.startswith("DESCRIPTION:"):
-            result["description"] = line[12:].strip()
-        elif line.startswith("SEO_KEYWORDS:"):
-            kws = line[13:].strip()
-            result["seo_keywords"] = [k.strip() for k in kws.split(",") if k.strip()]
-        elif line.startswith("HASHTAGS:"):
-            hs = line[9:].strip()
-            result["hashtags"] = [h.strip() for h in hs.split() if h.strip().startswith("#")]
-        elif line.startswith("TOPIC_TAGS:"):
-            ts = line[11:].strip()
-            result["topic_tags"] = [t.strip() for t in ts.split(",") if t.strip()]
-        elif line.startswith("SELL_REASON:"):
-            result["sell_reason"] = line[12:].strip()
+    for m in _FIELD_RE.finditer(text):
+        field, value = m.group(1), m.group(2).strip()
+        if field == "SEO_KEYWORDS":
+            result["seo_keywords"] = _split_commas(value)
+        elif field == "HASHTAGS":
+            result["hashtags"] = [h for h in value.split() if h.startswith("#")]
+        elif field == "TOPIC_TAGS":
+            result["topic_tags"] = _split_commas(value)
+        else:
+            result[field.lower()] = value
 
     # Fallbacks
     if not result["title"]:
@@ -120,29 +172,29 @@ def _parse_content_response(text: str, product: dict) -> dict:
     return result
 
 
-def calculate_best_posting_time() -> dict:
+_WEEKDAY_SLOT = MappingProxyType({
+    "primary":   "9:00 PM IST",
+    "secondary": "1:00 PM IST",
+    "reason":    "Weekday evenings (8PM-11PM IST) are peak times when people relax after work.",
+})
+_SATURDAY_SLOT = MappingProxyType({
+    "primary":   "7:30 PM IST",
+    "secondary": "11:00 AM IST",
+    "reason":    "Saturday evenings are highly active. People browse Pinterest during leisure time.",
+})
+_SUNDAY_SLOT = MappingProxyType({  # highest traffic
+    "primary":   "8:00 PM IST",
+    "secondary": "10:00 AM IST",
+    "reason":    "Sunday has the highest Pinterest traffic in India. Evening slots see peak engagement.",
+})
+
+# Indexed by weekday(): 0=Mon … 6=Sun. Read-only so callers can't mutate the shared slots.
+_POSTING_TIMES = (_WEEKDAY_SLOT,) * 5 + (_SATURDAY_SLOT, _SUNDAY_SLOT)
+
+
+def calculate_best_posting_time() -> MappingProxyType:
     """
     Calculate best Pinterest posting time in IST.
     Based on platform data and day of week.
     """
-    now_ist = datetime.now(timezone.utc)
-    weekday = now_ist.weekday()  # 0=Mon, 6=Sun
-
-    if weekday == 6:  # Sunday — highest traffic
-        primary   = "8:00 PM IST"
-        secondary = "10:00 AM IST"
-        reason    = "Sunday has the highest Pinterest traffic in India. Evening slots see peak engagement."
-    elif weekday == 5:  # Saturday
-        primary   = "7:30 PM IST"
-        secondary = "11:00 AM IST"
-        reason    = "Saturday evenings are highly active. People browse Pinterest during leisure time."
-    else:  # Weekdays
-        primary   = "9:00 PM IST"
-        secondary = "1:00 PM IST"
-        reason    = "Weekday evenings (8PM-11PM IST) are peak times when people relax after work."
-
-    return {
-        "primary":   primary,
-        "secondary": secondary,
-        "reason":    reason,
-    }
+    return _POSTING_TIMES[datetime.now(timezone.utc).weekday()]
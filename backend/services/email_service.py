@@ -2,14 +2,54 @@
 Email Service — Gmail SMTP.
 Sends all 12 notification types as defined in agent instructions.
 """
-import smtplib
+import asyncio
 import logging
+import aiosmtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from string import Template
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+
+# One authenticated Gmail session, reused across notifications
+_smtp: aiosmtplib.SMTP | None = None
+_smtp_creds: tuple[str, str] | None = None
+_smtp_lock = asyncio.Lock()
+
+
+async def _get_smtp(gmail: str, password: str) -> aiosmtplib.SMTP:
+    """Return the logged-in session, reconnecting if needed. Caller holds _smtp_lock."""
+    global _smtp, _smtp_creds
+    if _smtp is not None and _smtp.is_connected and _smtp_creds == (gmail, password):
+        return _smtp
+    await _drop_smtp()
+    smtp = aiosmtplib.SMTP(hostname=SMTP_HOST, port=SMTP_PORT, use_tls=True, timeout=30)
+    await smtp.connect()
+    await smtp.login(gmail, password)
+    _smtp, _smtp_creds = smtp, (gmail, password)
+    return smtp
+
+
+async def _drop_smtp():
+    """Quit the current session (if any) and forget it."""
+    global _smtp, _smtp_creds
+    if _smtp is not None:
+        try:
+            await _smtp.quit()
+        except Exception:
+            _smtp.close()
+    _smtp, _smtp_creds = None, None
+
+
+async def close_smtp():
+    """Close the shared SMTP session. Called on app shutdown."""
+    async with _smtp_lock:
+        await _drop_smtp()
+
 
 async def send_email(
     gmail: str,
@@ -26,9 +66,15 @@ async def send_email(
         msg["To"]      = to
         msg.attach(MIMEText(html_body, "html"))
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(gmail, password)
-            server.sendmail(gmail, to, msg.as_string())
+        async with _smtp_lock:
+            try:
+                smtp = await _get_smtp(gmail, password)
+                await smtp.send_message(msg)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Gmail drops idle sessions — reconnect once and resend
+                await _drop_smtp()
+                smtp = await _get_smtp(gmail, password)
+                await smtp.send_message(msg)
 
         logger.info(f"Email sent to {to}: {subject}")
         return True
@@ -37,31 +83,30 @@ async def send_email(
         return False
 
 
-def _base_template(title: str, body: str) -> str:
-    """Create branded HTML email template."""
-    return f"""
+# Branded shell, built once at import — only $title and $body vary per send
+_EMAIL_TPL = Template("""
 <!DOCTYPE html>
 <html>
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <style>
-    body {{ font-family: Inter, Arial, sans-serif; background: #1A0A10; color: #F8E8F0; margin: 0; padding: 0; }}
-    .container {{ max-width: 600px; margin: 0 auto; padding: 24px; }}
-    .header {{ background: #E8426A; padding: 20px 24px; border-radius: 16px 16px 0 0; }}
-    .header h1 {{ margin: 0; font-size: 20px; color: white; }}
-    .body {{ background: #2A1520; padding: 24px; border-radius: 0 0 16px 16px; border: 1px solid #3D1F2A; }}
-    .footer {{ text-align: center; margin-top: 16px; font-size: 12px; color: #C4899E; }}
-    a {{ color: #E8426A; }}
-    .btn {{ display: inline-block; background: #E8426A; color: white !important; text-decoration: none; padding: 12px 24px; border-radius: 12px; font-weight: bold; margin-top: 16px; }}
+    body { font-family: Inter, Arial, sans-serif; background: #1A0A10; color: #F8E8F0; margin: 0; padding: 0; }
+    .container { max-width: 600px; margin: 0 auto; padding: 24px; }
+    .header { background: #E8426A; padding: 20px 24px; border-radius: 16px 16px 0 0; }
+    .header h1 { margin: 0; font-size: 20px; color: white; }
+    .body { background: #2A1520; padding: 24px; border-radius: 0 0 16px 16px; border: 1px solid #3D1F2A; }
+    .footer { text-align: center; margin-top: 16px; font-size: 12px; color: #C4899E; }
+    a { color: #E8426A; }
+    .btn { display: inline-block; background: #E8426A; color: white !important; text-decoration: none; padding: 12px 24px; border-radius: 12px; font-weight: bold; margin-top: 16px; }
   </style>
 </head>
 <body>
   <div class="container">
     <div class="header"><h1>📌 PinProfit</h1></div>
     <div class="body">
-      <h2>{title}</h2>
-      {body}
+      <h2>$title</h2>
+      $body
     </div>
     <div class="footer">
       PinProfit &mdash; Your Automated Affiliate Pin System<br>
@@ -69,7 +114,12 @@ def _base_template(title: str, body: str) -> str:
     </div>
   </div>
 </body>
-</html>"""
+</html>""")
+
+
+def _base_template(title: str, body: str) -> str:
+    """Create branded HTML email template."""
+    return _EMAIL_TPL.substitute(title=title, body=body)
 
 
 async def send_research_started(gmail, password, to, niche):
@@ -82,17 +132,29 @@ async def send_research_started(gmail, password, to, niche):
         """))
 
 
+_PRODUCT_LI = "<li><strong>{title}...</strong> — Score: {score} — {platform}</li>".format_map
+
+_RESEARCH_COMPLETE_TPL = Template("""
+        <p>Research for <strong>'$niche'</strong> is done!</p>
+        <p>We found <strong>$product_count high-scoring products</strong>.</p>
+        <p><strong>Top 3 picks:</strong></p>
+        <ul>$products_html</ul>
+        <a href="#" class="btn">Open App to Create Pins →</a>
+        """)
+
+
 async def send_research_complete(gmail, password, to, niche, product_count, top_products):
     products_html = "".join(
-        f"<li><strong>{p.get('title', '')[:60]}...</strong> — Score: {p.get('score', 0)} — {p.get('platform', '').title()}</li>"
+        _PRODUCT_LI({
+            "title": p.get("title", "")[:60],
+            "score": p.get("score", 0),
+            "platform": p.get("platform", "").title(),
+        })
         for p in top_products[:3]
     )
     await send_email(gmail, password, to,
         f"[{product_count}] Products Found! Research Complete 🎉",
-        _base_template(f"Research Complete! {product_count} Products Found", f"""
-        <p>Research for <strong>'{niche}'</strong> is done!</p>
-        <p>We found <strong>{product_count} high-scoring products</strong>.</p>
-        <p><strong>Top 3 picks:</strong></p>
-        <ul>{products_html}</ul>
-        <a href="#" class="btn">Open App to Create Pins →</a>
-        """))
+        _base_template(
+            f"Research Complete! {product_count} Products Found",
+            _RESEARCH_COMPLETE_TPL.substitute(niche=niche, product_count=product_count, products_html=products_html),
+        ))
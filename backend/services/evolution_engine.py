@@ -3,7 +3,7 @@ Evolution Engine — The learning brain of PinProfit.
 Logs every action. Runs nightly analysis.
 Gets smarter every day. All data stored in Supabase.
 """
-import json
+import asyncio
 import logging
 from datetime import datetime, timezone
 
@@ -15,46 +15,28 @@ def _sb():
     return get_supabase()
 
 
-async def log_research_complete(niche: str, products_found: int):
+async def _log_event(event_type: str, payload: dict, what: str):
+    """Insert one evolution_performance_log row; logging must never break the caller."""
+    payload["timestamp"] = datetime.now(timezone.utc).isoformat()
     try:
-        _sb().table("evolution_performance_log").insert({
-            "event_type": "research_complete",
-            "data": json.dumps({
-                "niche": niche,
-                "products_found": products_found,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }),
-        }).execute()
+        await asyncio.to_thread(_sb().table("evolution_performance_log").insert({
+            "event_type": event_type,
+            "data": payload,
+        }).execute)
     except Exception as e:
-        logger.warning(f"Could not log research completion: {e}")
+        logger.warning(f"Could not log {what}: {e}")
+
+
+async def log_research_complete(niche: str, products_found: int):
+    await _log_event("research_complete", {"niche": niche, "products_found": products_found}, "research completion")
 
 
 async def log_pin_approved(pin_id: int, niche: str, content: dict):
-    try:
-        _sb().table("evolution_performance_log").insert({
-            "event_type": "pin_approved",
-            "data": json.dumps({
-                "pin_id": pin_id,
-                "niche": niche,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }),
-        }).execute()
-    except Exception as e:
-        logger.warning(f"Could not log pin approval: {e}")
+    await _log_event("pin_approved", {"pin_id": pin_id, "niche": niche}, "pin approval")
 
 
 async def log_pin_skipped(pin_id: int, reason: str):
-    try:
-        _sb().table("evolution_performance_log").insert({
-            "event_type": "pin_skipped",
-            "data": json.dumps({
-                "pin_id": pin_id,
-                "reason": reason,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }),
-        }).execute()
-    except Exception as e:
-        logger.warning(f"Could not log pin skip: {e}")
+    await _log_event("pin_skipped", {"pin_id": pin_id, "reason": reason}, "pin skip")
 
 
 async def run_nightly_analysis():
@@ -68,42 +50,20 @@ async def run_nightly_analysis():
     sb = _sb()
 
     try:
-        # Read performance events
-        r = sb.table("evolution_performance_log").select("*").eq("event_type", "research_complete").execute()
-        research_events = r.data or []
-
-        # Analyze top niches
-        niche_counts = {}
-        for event in research_events:
-            try:
-                data = json.loads(event.get("data", "{}")) if isinstance(event.get("data"), str) else event.get("data", {})
-                niche = data.get("niche", "unknown")
-                niche_counts[niche] = niche_counts.get(niche, 0) + 1
-            except Exception:
-                pass
-
-        top_niches = sorted(niche_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-        # Upsert strategy memory
-        sb.table("evolution_strategy_memory").upsert({
-            "key": "top_niches",
-            "value": json.dumps(top_niches),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).execute()
-
-        sb.table("evolution_strategy_memory").upsert({
-            "key": "last_updated",
-            "value": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).execute()
-
-        # Add learning history entry
-        insights = f"Analyzed {len(research_events)} research sessions. Top niche: {top_niches[0][0] if top_niches else 'N/A'}"
-        sb.table("evolution_learning_history").insert({
-            "date": datetime.now(timezone.utc).isoformat(),
-            "research_sessions": len(research_events),
-            "insights": insights,
-        }).execute()
+        # Niche tallies are aggregated in Postgres
+        r = await asyncio.to_thread(sb.rpc("research_niche_counts", {"limit_n": 10}).execute)
+        summary = r.data or {}
+        session_count = summary.get("sessions", 0)
+        top_niches = summary.get("top_niches") or []
+
+        # Write strategy memory + learning history in a single round-trip
+        insights = f"Analyzed {session_count} research sessions. Top niche: {top_niches[0][0] if top_niches else 'N/A'}"
+        await asyncio.to_thread(sb.rpc("nightly_evolution_commit", {
+            "top_niches_json": top_niches,
+            "insight_text": insights,
+            "session_count": session_count,
+            "run_at": datetime.now(timezone.utc).isoformat(),
+        }).execute)
 
         logger.info("Nightly evolution analysis complete.")
         return {"top_niches": top_niches}
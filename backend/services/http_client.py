@@ -0,0 +1,62 @@
+"""
+Shared HTTP client — one pooled httpx.AsyncClient for all outbound API calls.
+Keeps TCP/TLS connections alive between requests to the same host.
+"""
+import asyncio
+import httpx
+
+_client: httpx.AsyncClient | None = None
+
+CONNECT_RETRIES = 3
+RATE_LIMIT_RETRIES = 3
+MAX_RETRY_AFTER = 30  # seconds
+
+
+class _RateLimitTransport(httpx.AsyncHTTPTransport):
+    """
+    Retries connection failures and waits out 429s using the provider's Retry-After.
+    The only retry layer for those two cases — callers' own retries must not repeat them.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for _ in range(RATE_LIMIT_RETRIES):
+            response = await super().handle_async_request(request)
+            if response.status_code != 429:
+                return response
+            await response.aclose()
+            await asyncio.sleep(_retry_after(response.headers.get("Retry-After")))
+        return await super().handle_async_request(request)
+
+
+def _retry_after(value: str | None) -> float:
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return 1.0  # missing or HTTP-date form
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared AsyncClient (HTTP/2, keep-alive pool)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=15,
+            transport=_RateLimitTransport(
+                http2=True,
+                retries=CONNECT_RETRIES,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=30,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client. Called on app shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
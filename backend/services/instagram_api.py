@@ -3,10 +3,11 @@ Instagram API Service
 Handles OAuth, content publishing via Instagram Graph API.
 Uses Facebook/Instagram Graph API for business accounts.
 """
+import asyncio
 import logging
-import httpx
 import os
 from urllib.parse import urlencode
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,8 @@ GRAPH_API_BASE = "https://graph.instagram.com"
 FACEBOOK_GRAPH_BASE = "https://graph.facebook.com/v19.0"
 FACEBOOK_OAUTH_URL = "https://www.facebook.com/v19.0/dialog/oauth"
 
+CONTAINER_POLL_ATTEMPTS = 10
+
 
 class InstagramAPI:
     def __init__(self, access_token: str = None):
@@ -21,48 +24,52 @@ class InstagramAPI:
 
     async def get_user(self) -> dict:
         """Get authenticated user info."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                f"{GRAPH_API_BASE}/me",
-                params={
-                    "fields": "id,username,account_type,media_count",
-                    "access_token": self.access_token,
-                },
-            )
-            r.raise_for_status()
-            return r.json()
+        client = get_http_client()
+        r = await client.get(
+            f"{GRAPH_API_BASE}/me",
+            params={
+                "fields": "id,username,account_type,media_count",
+                "access_token": self.access_token,
+            },
+        )
+        r.raise_for_status()
+        return r.json()
 
     async def get_ig_business_account(self) -> str | None:
-        """Get Instagram business account ID linked to Facebook page."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            # Get Facebook pages
-            r = await client.get(
-                f"{FACEBOOK_GRAPH_BASE}/me/accounts",
-                params={"access_token": self.access_token},
-            )
-            if r.status_code != 200:
-                return None
-
-            pages = r.json().get("data", [])
-            if not pages:
-                return None
+        """Get the Instagram business account ID linked to the user's Facebook pages."""
+        client = get_http_client()
+        # Get Facebook pages
+        r = await client.get(
+            f"{FACEBOOK_GRAPH_BASE}/me/accounts",
+            params={"access_token": self.access_token},
+        )
+        if r.status_code != 200:
+            return None
 
-            # Get IG business account from first page
-            page_id = pages[0]["id"]
-            page_token = pages[0]["access_token"]
+        pages = r.json().get("data", [])
+        if not pages:
+            return None
 
-            r2 = await client.get(
-                f"{FACEBOOK_GRAPH_BASE}/{page_id}",
+        # Look up every page's linked IG business account concurrently
+        lookups = await asyncio.gather(*(
+            client.get(
+                f"{FACEBOOK_GRAPH_BASE}/{page['id']}",
                 params={
                     "fields": "instagram_business_account",
-                    "access_token": page_token,
+                    "access_token": page["access_token"],
                 },
             )
-            if r2.status_code == 200:
-                data = r2.json()
-                ig = data.get("instagram_business_account", {})
-                return ig.get("id")
-            return None
+            for page in pages
+        ), return_exceptions=True)
+
+        # First page (in Facebook's order) that has one wins
+        for r2 in lookups:
+            if isinstance(r2, Exception) or r2.status_code != 200:
+                continue
+            ig = r2.json().get("instagram_business_account", {})
+            if ig.get("id"):
+                return ig["id"]
+        return None
 
     async def publish_image(
         self,
@@ -73,47 +80,75 @@ class InstagramAPI:
         """
         Publish an image post to Instagram.
         Two-step process: create media container, then publish.
+        Raises RuntimeError when the container can't be created or processed.
         """
-        async with httpx.AsyncClient(timeout=30) as client:
-            # Step 1: Create media container
-            r1 = await client.post(
-                f"{FACEBOOK_GRAPH_BASE}/{ig_account_id}/media",
-                params={
-                    "image_url": image_url,
-                    "caption": caption[:2200],  # Instagram caption limit
-                    "access_token": self.access_token,
-                },
-            )
-            r1.raise_for_status()
-            container_id = r1.json().get("id")
-
-            if not container_id:
-                return {"error": "Failed to create media container"}
+        client = get_http_client()
+        # Step 1: Create media container
+        r1 = await client.post(
+            f"{FACEBOOK_GRAPH_BASE}/{ig_account_id}/media",
+            params={
+                "image_url": image_url,
+                "caption": caption[:2200],  # Instagram caption limit
+                "access_token": self.access_token,
+            },
+            timeout=30,
+        )
+        r1.raise_for_status()
+        container_id = r1.json().get("id")
+
+        if not container_id:
+            raise RuntimeError("Failed to create media container")
+
+        # Wait for Meta to finish processing the image before publishing
+        status = await self._wait_for_container(container_id)
+        if status == "ERROR":
+            raise RuntimeError("Instagram could not process the image")
+        if status == "IN_PROGRESS":
+            raise RuntimeError("Instagram still processing the image after the last poll")
+
+        # Step 2: Publish
+        r2 = await client.post(
+            f"{FACEBOOK_GRAPH_BASE}/{ig_account_id}/media_publish",
+            params={
+                "creation_id": container_id,
+                "access_token": self.access_token,
+            },
+            timeout=30,
+        )
+        r2.raise_for_status()
+        return r2.json()
 
-            # Step 2: Publish
-            r2 = await client.post(
-                f"{FACEBOOK_GRAPH_BASE}/{ig_account_id}/media_publish",
-                params={
-                    "creation_id": container_id,
-                    "access_token": self.access_token,
-                },
+    async def _wait_for_container(self, container_id: str) -> str | None:
+        """Poll a media container (backoff 0.5s × 1.5) until it leaves IN_PROGRESS."""
+        client = get_http_client()
+        delay = 0.5
+        status = None
+        for _ in range(CONTAINER_POLL_ATTEMPTS):
+            await asyncio.sleep(delay)
+            r = await client.get(
+                f"{FACEBOOK_GRAPH_BASE}/{container_id}",
+                params={"fields": "status_code", "access_token": self.access_token},
             )
-            r2.raise_for_status()
-            return r2.json()
+            if r.status_code == 200:
+                status = r.json().get("status_code")
+                if status in ("FINISHED", "ERROR"):
+                    return status
+            delay *= 1.5
+        return status
 
     async def get_media_insights(self, media_id: str) -> dict:
         """Get insights for a published post."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                f"{FACEBOOK_GRAPH_BASE}/{media_id}/insights",
-                params={
-                    "metric": "impressions,reach,engagement,saved",
-                    "access_token": self.access_token,
-                },
-            )
-            if r.status_code == 200:
-                return r.json()
-            return {}
+        client = get_http_client()
+        r = await client.get(
+            f"{FACEBOOK_GRAPH_BASE}/{media_id}/insights",
+            params={
+                "metric": "impressions,reach,engagement,saved",
+                "access_token": self.access_token,
+            },
+        )
+        if r.status_code == 200:
+            return r.json()
+        return {}
 
 
 def get_oauth_url(app_id: str, redirect_uri: str, state: str = "pinprofit") -> str:
@@ -135,29 +170,29 @@ async def exchange_code_for_token(
     redirect_uri: str,
 ) -> dict:
     """Exchange authorization code for long-lived access token."""
-    async with httpx.AsyncClient(timeout=15) as client:
-        # Step 1: Get short-lived token
-        r = await client.get(
-            f"{FACEBOOK_GRAPH_BASE}/oauth/access_token",
-            params={
-                "client_id": app_id,
-                "client_secret": app_secret,
-                "redirect_uri": redirect_uri,
-                "code": code,
-            },
-        )
-        r.raise_for_status()
-        short_token = r.json().get("access_token")
-
-        # Step 2: Exchange for long-lived token (60 days)
-        r2 = await client.get(
-            f"{FACEBOOK_GRAPH_BASE}/oauth/access_token",
-            params={
-                "grant_type": "fb_exchange_token",
-                "client_id": app_id,
-                "client_secret": app_secret,
-                "fb_exchange_token": short_token,
-            },
-        )
-        r2.raise_for_status()
-        return r2.json()
+    client = get_http_client()
+    # Step 1: Get short-lived token
+    r = await client.get(
+        f"{FACEBOOK_GRAPH_BASE}/oauth/access_token",
+        params={
+            "client_id": app_id,
+            "client_secret": app_secret,
+            "redirect_uri": redirect_uri,
+            "code": code,
+        },
+    )
+    r.raise_for_status()
+    short_token = r.json().get("access_token")
+
+    # Step 2: Exchange for long-lived token (60 days)
+    r2 = await client.get(
+        f"{FACEBOOK_GRAPH_BASE}/oauth/access_token",
+        params={
+            "grant_type": "fb_exchange_token",
+            "client_id": app_id,
+            "client_secret": app_secret,
+            "fb_exchange_token": short_token,
+        },
+    )
+    r2.raise_for_status()
+    return r2.json()
@@ -4,15 +4,20 @@ Handles OAuth, pin creation, analytics fetching.
 Uses Pinterest API v5.
 """
 import logging
-import httpx
 import os
+import orjson
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
 from urllib.parse import urlencode
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
 PINTEREST_API_BASE = "https://api.pinterest.com/v5"
 PINTEREST_OAUTH_URL = "https://api.pinterest.com/oauth/"
 
+BOARDS_PAGE_SIZE = 100
+
 
 class PinterestAPI:
     def __init__(self, access_token: str = None):
@@ -24,10 +29,10 @@ class PinterestAPI:
 
     async def get_user(self) -> dict:
         """Get authenticated user info."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(f"{PINTEREST_API_BASE}/user_account", headers=self.headers)
-            r.raise_for_status()
-            return r.json()
+        client = get_http_client()
+        r = await client.get(f"{PINTEREST_API_BASE}/user_account", headers=self.headers)
+        r.raise_for_status()
+        return r.json()
 
     async def create_pin(
         self,
@@ -52,50 +57,64 @@ class PinterestAPI:
         if alt_text:
             payload["alt_text"] = alt_text[:500]
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(
-                f"{PINTEREST_API_BASE}/pins",
-                headers=self.headers,
-                json=payload,
-            )
-            r.raise_for_status()
-            return r.json()
+        client = get_http_client()
+        r = await client.post(
+            f"{PINTEREST_API_BASE}/pins",
+            headers=self.headers,
+            content=orjson.dumps(payload),  # headers already carry the JSON content type
+            timeout=30,
+        )
+        r.raise_for_status()
+        return r.json()
 
-    async def get_boards(self) -> list[dict]:
-        """Get user's boards."""
-        async with httpx.AsyncClient(timeout=15) as client:
+    async def iter_boards(self) -> AsyncIterator[dict]:
+        """Yield all of the user's boards, following the bookmark cursor."""
+        client = get_http_client()
+        params = {"page_size": BOARDS_PAGE_SIZE}
+        while True:
             r = await client.get(
                 f"{PINTEREST_API_BASE}/boards",
                 headers=self.headers,
-                params={"page_size": 50},
+                params=params,
             )
             r.raise_for_status()
-            return r.json().get("items", [])
+            data = r.json()
+            for board in data.get("items", []):
+                yield board
+            bookmark = data.get("bookmark")
+            if not bookmark:
+                return
+            params = {"page_size": BOARDS_PAGE_SIZE, "bookmark": bookmark}
+
+    async def get_boards(self) -> list[dict]:
+        """Get user's boards."""
+        return [board async for board in self.iter_boards()]
 
     async def get_pin_analytics(self, pin_id: str, days: int = 30) -> dict:
-        """Get analytics for a specific pin."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                f"{PINTEREST_API_BASE}/pins/{pin_id}/analytics",
-                headers=self.headers,
-                params={
-                    "start_date": f"2024-01-01",
-                    "end_date": "2026-12-31",
-                    "metric_types": "IMPRESSION,SAVE,PIN_CLICK,OUTBOUND_CLICK",
-                },
-            )
-            if r.status_code == 200:
-                return r.json()
-            return {}
+        """Get analytics for a specific pin over the last `days` days."""
+        end = datetime.now(timezone.utc).date()
+        client = get_http_client()
+        r = await client.get(
+            f"{PINTEREST_API_BASE}/pins/{pin_id}/analytics",
+            headers=self.headers,
+            params={
+                "start_date": (end - timedelta(days=days)).isoformat(),
+                "end_date": end.isoformat(),
+                "metric_types": "IMPRESSION,SAVE,PIN_CLICK,OUTBOUND_CLICK",
+            },
+        )
+        if r.status_code == 200:
+            return r.json()
+        return {}
 
     async def delete_pin(self, pin_id: str) -> bool:
         """Delete a pin."""
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.delete(
-                f"{PINTEREST_API_BASE}/pins/{pin_id}",
-                headers=self.headers,
-            )
-            return r.status_code == 204
+        client = get_http_client()
+        r = await client.delete(
+            f"{PINTEREST_API_BASE}/pins/{pin_id}",
+            headers=self.headers,
+        )
+        return r.status_code == 204
 
 
 def get_oauth_url(app_id: str, redirect_uri: str, state: str = "pinprofit") -> str:
@@ -117,15 +136,15 @@ async def exchange_code_for_token(
     redirect_uri: str,
 ) -> dict:
     """Exchange authorization code for access token."""
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            f"{PINTEREST_API_BASE}/oauth/token",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": redirect_uri,
-            },
-            auth=(app_id, app_secret),
-        )
-        r.raise_for_status()
-        return r.json()
+    client = get_http_client()
+    r = await client.post(
+        f"{PINTEREST_API_BASE}/oauth/token",
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+        },
+        auth=(app_id, app_secret),
+    )
+    r.raise_for_status()
+    return r.json()
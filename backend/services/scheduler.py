@@ -1,95 +1,138 @@
 """
 Background Scheduler — All automated tasks.
-Uses APScheduler for all scheduled jobs.
+Each job is a plain asyncio task that sleeps until its next run.
 """
+import asyncio
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
-scheduler = AsyncIOScheduler(timezone="Asia/Kolkata")
+IST = ZoneInfo("Asia/Kolkata")
+MON, SUN = 0, 6
+
+PUBLISH_POLL = 60       # longest sleep — catches pins queued by other workers or SQL
+
+_tasks: dict[str, asyncio.Task] = {}
+
+
+def _seconds_until(hour: int, minute: int, weekday: int | None = None) -> float:
+    """Seconds until the next hour:minute IST (optionally on a given weekday)."""
+    now = datetime.now(IST)
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if weekday is not None:
+        run_at += timedelta(days=(weekday - now.weekday()) % 7)
+    if run_at <= now:
+        run_at += timedelta(days=7 if weekday is not None else 1)
+    return (run_at - now).total_seconds()
+
+
+async def _run(job_id: str, job):
+    try:
+        await job()
+    except Exception:
+        logger.exception(f"Scheduled job {job_id} failed")
+
+
+async def _every(job_id: str, seconds: float, job):
+    while True:
+        await asyncio.sleep(seconds)
+        await _run(job_id, job)
+
+
+async def _at(job_id: str, hour: int, minute: int, job, weekday: int | None = None):
+    while True:
+        await asyncio.sleep(_seconds_until(hour, minute, weekday))
+        await _run(job_id, job)
+
+
+async def _next_due_at() -> datetime | None:
+    from services.supabase_client import get_supabase
+    sb = get_supabase()
+    res = await asyncio.to_thread(
+        sb.table("published_pins").select("scheduled_time")
+        .eq("status", "pending").not_.is_("scheduled_time", "null")
+        .order("scheduled_time").limit(1).execute
+    )
+    if not res.data:
+        return None
+    return datetime.fromisoformat(res.data[0]["scheduled_time"].replace("Z", "+00:00"))
+
+
+async def _publisher_loop():
+    """Sleep until the earliest pending pin is due, re-checking at least every PUBLISH_POLL s."""
+    ran = False
+    while True:
+        try:
+            next_at = await _next_due_at()
+        except Exception as e:
+            logger.warning(f"Due-pin lookup failed: {e}")
+            next_at = None
+        delay = PUBLISH_POLL
+        if next_at is not None:
+            delay = min(delay, (next_at - datetime.now(timezone.utc)).total_seconds())
+        if ran:
+            # Pins still due after a pass wait a full poll before the retry
+            delay = PUBLISH_POLL
+        ran = False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if next_at is not None and next_at <= datetime.now(timezone.utc):
+            await _run("pin_publisher", _publish_due_pins)
+            ran = True
+
+
+def _add(job_id: str, coro):
+    old = _tasks.pop(job_id, None)
+    if old:
+        old.cancel()
+    _tasks[job_id] = asyncio.create_task(coro, name=job_id)
 
 
 async def start_scheduler():
     """Register all background tasks and start scheduler."""
 
-    # 1. Pin publisher — every minute
-    scheduler.add_job(
-        _publish_due_pins,
-        trigger="interval",
-        minutes=1,
-        id="pin_publisher",
-        replace_existing=True,
-    )
+    # 1. Pin publisher — wakes when the next pending pin is due
+    _add("pin_publisher", _publisher_loop())
 
     # 2. Analytics sync — every 6 hours
-    scheduler.add_job(
-        _sync_analytics,
-        trigger="interval",
-        hours=6,
-        id="analytics_sync",
-        replace_existing=True,
-    )
+    _add("analytics_sync", _every("analytics_sync", 6 * 3600, _sync_analytics))
 
     # 3. Competitor analysis — every Monday 6 AM IST
-    scheduler.add_job(
-        _run_competitor_analysis,
-        trigger=CronTrigger(day_of_week="mon", hour=6, minute=0),
-        id="competitor_analysis",
-        replace_existing=True,
-    )
+    _add("competitor_analysis", _at("competitor_analysis", 6, 0, _run_competitor_analysis, weekday=MON))
 
     # 4. Nightly evolution — every night 3 AM IST
-    scheduler.add_job(
-        _run_nightly_evolution,
-        trigger=CronTrigger(hour=3, minute=0),
-        id="nightly_evolution",
-        replace_existing=True,
-    )
+    _add("nightly_evolution", _at("nightly_evolution", 3, 0, _run_nightly_evolution))
 
     # 5. Weekly report — Sunday 8 PM IST
-    scheduler.add_job(
-        _generate_weekly_report,
-        trigger=CronTrigger(day_of_week="sun", hour=20, minute=0),
-        id="weekly_report",
-        replace_existing=True,
-    )
+    _add("weekly_report", _at("weekly_report", 20, 0, _generate_weekly_report, weekday=SUN))
 
     # 6. Storage cleanup — every night 2 AM IST
-    scheduler.add_job(
-        _cleanup_storage,
-        trigger=CronTrigger(hour=2, minute=0),
-        id="storage_cleanup",
-        replace_existing=True,
-    )
+    _add("storage_cleanup", _at("storage_cleanup", 2, 0, _cleanup_storage))
 
     # 7. Trend alerts — every 6 hours
-    scheduler.add_job(
-        _check_trend_alerts,
-        trigger="interval",
-        hours=6,
-        id="trend_alerts",
-        replace_existing=True,
-    )
+    _add("trend_alerts", _every("trend_alerts", 6 * 3600, _check_trend_alerts))
 
     # 8. Token health check — every 6 hours
-    scheduler.add_job(
-        _check_token_health,
-        trigger="interval",
-        hours=6,
-        id="token_health",
-        replace_existing=True,
-    )
+    _add("token_health", _every("token_health", 6 * 3600, _check_token_health))
 
-    scheduler.start()
-    logger.info("Scheduler started with all 8 jobs.")
+    # 9. Token state flush — a few seconds after usage trackers change it
+    _add("token_state_flush", _run_token_state_flusher())
+
+    logger.info(f"Scheduler started with all {len(_tasks)} jobs.")
 
 
 async def stop_scheduler():
-    if scheduler.running:
-        scheduler.shutdown(wait=False)
-        logger.info("Scheduler stopped.")
+    if not _tasks:
+        return
+    tasks = list(_tasks.values())
+    _tasks.clear()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await _flush_token_state()  # don't lose usage counts bumped since the last tick
+    logger.info("Scheduler stopped.")
 
 
 # ────────────────────────────────────────────────
@@ -167,3 +210,14 @@ async def _check_token_health():
         await check_all_tokens()
     except Exception as e:
         logger.error(f"Token health check failed: {e}")
+
+
+async def _flush_token_state():
+    """Persist usage counters cached by token_manager."""
+    from services.token_manager import flush_state
+    await flush_state()
+
+
+async def _run_token_state_flusher():
+    from services.token_manager import run_state_flusher
+    await run_state_flusher()
@@ -4,26 +4,72 @@ Scrapes Amazon, Flipkart, Myntra, Meesho, Ajio, Nykaa, FirstCry
 All searches are dynamic — driven by niche keyword.
 Includes scoring, dedup, and competitor analysis.
 """
+import asyncio
+import gzip
+import hashlib
 import logging
+import os
 import time
 import random
 import re
-import json
+from collections import defaultdict
+from pathlib import Path
 from typing import Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import httpx
+import orjson
+import soupsieve as sv
 from bs4 import BeautifulSoup
-import requests
 
 logger = logging.getLogger(__name__)
 
-MAX_WORKERS = 4
+MAX_WORKERS = 8  # enough for every platform at once; pacing is per host
 MIN_SCORE   = 70
+HOST_INTERVAL = (3, 6)  # seconds between hits on the same host
+
+# Search-result pages cached on disk: sha1(url) -> gzip'd HTML
+PAGE_CACHE_DIR = Path(os.getenv("SCRAPER_CACHE_DIR", "/tmp/scraper_cache"))
+PAGE_CACHE_TTL = 6 * 3600
+FORCE_REFRESH  = os.getenv("SCRAPER_FORCE_REFRESH") == "1"
+MAX_PAGE_BYTES = 8 << 20  # decoded; search pages run ~1–2 MB
+
+# Bot-check / captcha interstitials come back as 200s — never cache those
+_BLOCKED_PAGE_RE = re.compile(
+    rb"validatecaptcha|robot check|are you a human|captcha-delivery|px-captcha", re.I
+)
+
+_host_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_last_hit: defaultdict[str, float] = defaultdict(float)
+
+# Pooled client kept across requests and research runs, so retries and
+# repeat searches on the same store reuse the open TCP/TLS connection
+_scrape_client: httpx.AsyncClient | None = None
+
+
+def _get_scrape_client() -> httpx.AsyncClient:
+    global _scrape_client
+    if _scrape_client is None or _scrape_client.is_closed:
+        _scrape_client = httpx.AsyncClient(
+            http2=True,  # concurrent fetches to one store share a single connection
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+        )
+    return _scrape_client
+
+
+async def close_scrape_client():
+    """Close the scraper's pooled client. Called on app shutdown."""
+    global _scrape_client
+    if _scrape_client is not None:
+        await _scrape_client.aclose()
+        _scrape_client = None
 
 
 # ──────────────────────────────────────────────
 # MAIN ENTRY POINT
 # ──────────────────────────────────────────────
-def scrape_all_platforms(
+async def scrape_all_platforms(
     niche: str,
     trends_data: dict,
     events_data: dict,
@@ -37,8 +83,6 @@ def scrape_all_platforms(
     relevant_platforms = _determine_platforms(niche)
     logger.info(f"Platforms for '{niche}': {relevant_platforms}")
 
-    all_products = []
-
     scrapers = {
         "amazon":   scrape_amazon,
         "flipkart": scrape_flipkart,
@@ -48,20 +92,28 @@ def scrape_all_platforms(
         "nykaa":    scrape_nykaa,
         "firstcry": scrape_firstcry,
     }
+    platforms = [p for p in relevant_platforms if p in scrapers]
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {
-            executor.submit(scrapers[p], niche): p
-            for p in relevant_platforms if p in scrapers
-        }
-        for future in as_completed(futures):
-            platform = futures[future]
-            try:
-                products = future.result()
-                logger.info(f"  {platform}: {len(products)} products scraped")
-                all_products.extend(products)
-            except Exception as e:
-                logger.error(f"  {platform} scrape failed: {e}")
+    # One event loop drives every platform; MAX_WORKERS caps how many run at once
+    sem = asyncio.Semaphore(MAX_WORKERS)
+
+    async def run(platform: str, client: httpx.AsyncClient) -> list[dict]:
+        async with sem:
+            return await scrapers[platform](client, niche)
+
+    client = _get_scrape_client()
+    results = await asyncio.gather(*(run(p, client) for p in platforms), return_exceptions=True)
+
+    all_products = []
+    for platform, products in zip(platforms, results):
+        if isinstance(products, Exception):
+            logger.error(f"  {platform} scrape failed: {products}")
+            continue
+        logger.info(f"  {platform}: {len(products)} products scraped")
+        all_products.extend(products)
+
+    # Drop duplicates before scoring so they cost nothing downstream
+    all_products = _dedupe_products(all_products)
 
     # Score all products
     scored = _score_products(all_products, niche, trends_data, events_data, pinterest_data)
@@ -80,62 +132,144 @@ def scrape_all_platforms(
 # PLATFORM SELECTOR (simple keyword logic —
 # Gemini integration added in Phase 3)
 # ──────────────────────────────────────────────
+def _keyword_re(keywords) -> re.Pattern:
+    """One alternation regex — a single scan instead of one `in` per keyword."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+_FASHION_RE = _keyword_re(["clothing", "dress", "saree", "fashion", "wear", "kurta",
+                           "shirt", "jeans", "lehenga", "tops", "outfit", "apparel"])
+_BEAUTY_RE  = _keyword_re(["beauty", "makeup", "skincare", "cosmetic", "lipstick",
+                           "moisturizer", "serum", "sunscreen", "hair care", "perfume"])
+_BABY_RE    = _keyword_re(["baby", "infant", "toddler", "kids", "children", "newborn"])
+
+
+# Fixed platform universe — selection is OR'd flags, listed in this order
+PLATFORM_BITS = {
+    "amazon": 1, "flipkart": 2, "myntra": 4, "meesho": 8,
+    "ajio": 16, "nykaa": 32, "firstcry": 64,
+}
+
+
 def _determine_platforms(niche: str) -> list[str]:
     niche_l = niche.lower()
-    platforms = ["amazon", "flipkart"]  # Always included
+    b = PLATFORM_BITS
+    mask = b["amazon"] | b["flipkart"] | b["meesho"]  # Always included
 
-    fashion_kw  = ["clothing", "dress", "saree", "fashion", "wear", "kurta",
-                   "shirt", "jeans", "lehenga", "tops", "outfit", "apparel"]
-    beauty_kw   = ["beauty", "makeup", "skincare", "cosmetic", "lipstick",
-                   "moisturizer", "serum", "sunscreen", "hair care", "perfume"]
-    baby_kw     = ["baby", "infant", "toddler", "kids", "children", "newborn"]
+    if _FASHION_RE.search(niche_l):
+        mask |= b["myntra"] | b["ajio"]
+    if _BEAUTY_RE.search(niche_l):
+        mask |= b["nykaa"] | b["myntra"]
+    if _BABY_RE.search(niche_l):
+        mask |= b["firstcry"]
 
-    if any(kw in niche_l for kw in fashion_kw):
-        platforms += ["myntra", "meesho", "ajio"]
-    if any(kw in niche_l for kw in beauty_kw):
-        platforms += ["nykaa", "myntra", "meesho"]
-    if any(kw in niche_l for kw in baby_kw):
-        platforms += ["firstcry", "meesho"]
-    if "meesho" not in platforms:
-        platforms.append("meesho")
-
-    return list(dict.fromkeys(platforms))  # Remove dups, preserve order
+    return [name for name, bit in PLATFORM_BITS.items() if mask & bit]
 
 
 # ──────────────────────────────────────────────
 # SCRAPERS
 # ──────────────────────────────────────────────
-def _get_headers() -> dict:
-    agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:124.0) Gecko/20100101 Firefox/124.0",
-        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Mobile Safari/537.36",
-        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1",
-    ]
-    return {
-        "User-Agent": random.choice(agents),
+_USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:124.0) Gecko/20100101 Firefox/124.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1",
+)
+
+# One ready-made header set per UA; httpx copies headers, never mutates these
+_HEADERS = tuple(
+    {
+        "User-Agent": ua,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
         "Accept-Language": "en-IN,en-US;q=0.9,en;q=0.8",
         "Accept-Encoding": "gzip, deflate, br",
         "DNT": "1",
         "Connection": "keep-alive",
     }
+    for ua in _USER_AGENTS
+)
+
+
+def _get_headers() -> dict:
+    return random.choice(_HEADERS)
+
+
+def _page_cache_path(url: str) -> Path:
+    return PAGE_CACHE_DIR / hashlib.sha1(url.encode()).hexdigest()
+
+
+def _read_cached_page(url: str) -> bytes | None:
+    path = _page_cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime < PAGE_CACHE_TTL:
+            return gzip.decompress(path.read_bytes())
+    except (OSError, EOFError, gzip.BadGzipFile):
+        pass  # missing, unreadable or truncated — refetch
+    return None
 
 
-def _safe_get(url: str, retries: int = 3) -> BeautifulSoup | None:
-    """Fetch URL with retry logic and rate limiting."""
+def _write_cached_page(url: str, body: bytes):
+    if _BLOCKED_PAGE_RE.search(body):
+        logger.warning(f"Bot-check page, not cached: {url}")
+        return
+    path = _page_cache_path(url)
+    try:
+        PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(body))
+        tmp.replace(path)  # atomic: readers never see a half-written page
+    except OSError as e:
+        logger.debug(f"Page cache write failed: {e}")
+
+
+async def _pace_host(host: str, extra_delay: float = 0):
+    """Space requests to the same store 3–6 s apart; different stores never wait on each other."""
+    async with _host_locks[host]:
+        wait = _last_hit[host] + random.uniform(*HOST_INTERVAL) + extra_delay - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _last_hit[host] = time.monotonic()
+
+
+async def _read_capped(r: httpx.Response) -> bytes | None:
+    """Decode the body chunk by chunk; None as soon as it passes MAX_PAGE_BYTES."""
+    chunks, size = [], 0
+    async for chunk in r.aiter_bytes(65536):
+        size += len(chunk)
+        if size > MAX_PAGE_BYTES:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _safe_get(client: httpx.AsyncClient, url: str, retries: int = 3) -> BeautifulSoup | None:
+    """
+    Fetch URL with retry logic and rate limiting; search pages are cached on disk for 6h.
+    Callers decompose() the soup once parsed — a bs4 tree is a web of
+    parent/child cycles that otherwise waits for the cyclic GC to be freed.
+    """
+    cached = None if FORCE_REFRESH else await asyncio.to_thread(_read_cached_page, url)
+    if cached is not None:
+        return await asyncio.to_thread(BeautifulSoup, cached, "lxml")
+
     delays = [0, 5, 15]
     for attempt in range(retries):
         try:
-            time.sleep(random.uniform(3, 6) + delays[attempt])
-            r = requests.get(url, headers=_get_headers(), timeout=30)
+            await _pace_host(urlparse(url).netloc, delays[attempt])
+            async with client.stream("GET", url, headers=_get_headers()) as r:
+                body = await _read_capped(r) if r.status_code == 200 else None
             if r.status_code == 200:
-                return BeautifulSoup(r.content, "html.parser")
+                if body is None:
+                    logger.warning(f"Page over {MAX_PAGE_BYTES >> 20} MB, skipped: {url}")
+                    return None
+                await asyncio.to_thread(_write_cached_page, url, body)
+                # Tokenising the page is CPU-bound — keep it off the event loop
+                return await asyncio.to_thread(BeautifulSoup, body, "lxml")
             if r.status_code in (403, 429):
                 logger.warning(f"Rate limited ({r.status_code}) — waiting 60s")
-                time.sleep(60)
+                await asyncio.sleep(60)
             else:
                 logger.warning(f"HTTP {r.status_code} for {url}")
         except Exception as e:
@@ -143,11 +277,18 @@ def _safe_get(url: str, retries: int = 3) -> BeautifulSoup | None:
     return None
 
 
+# Every byte except 0-9 and "." — bytes.translate drops them in one C pass
+_NON_PRICE_BYTES = bytes(c for c in range(256) if c not in b"0123456789.")
+_NUM_RE         = re.compile(r"(\d+\.?\d*)")
+_SEP_RE         = re.compile(r"[,\s]")
+_INT_RE         = re.compile(r"(\d+)")
+
+
 def _parse_price(text: str) -> float | None:
     """Extract numeric price from string like '₹1,299'."""
     if not text:
         return None
-    cleaned = re.sub(r"[^\d.]", "", text)
+    cleaned = text.encode("ascii", "ignore").translate(None, _NON_PRICE_BYTES)
     try:
         return float(cleaned) if cleaned else None
     except ValueError:
@@ -157,20 +298,123 @@ def _parse_price(text: str) -> float | None:
 def _parse_rating(text: str) -> float | None:
     if not text:
         return None
-    m = re.search(r"(\d+\.?\d*)", text)
+    m = _NUM_RE.search(text)
     return float(m.group(1)) if m else None
 
 
 def _parse_reviews(text: str) -> int | None:
     if not text:
         return None
-    cleaned = re.sub(r"[,\s]", "", text.split("(")[-1].split(")")[0])
-    m = re.search(r"(\d+)", cleaned)
+    cleaned = _SEP_RE.sub("", text.split("(")[-1].split(")")[0])
+    m = _INT_RE.search(cleaned)
     return int(m.group(1)) if m else None
 
 
+_ASIN_RE = re.compile(r"/dp/([A-Z0-9]{10})")
+
+
+def _num(value) -> float | None:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return _parse_price(str(value))
+
+
+def _jsonld_products(soup, platform: str, base_url: str) -> list[dict]:
+    """
+    Products from the page's <script type="application/ld+json"> blocks
+    (Product or ItemList). Empty list when the page carries none, so
+    callers fall back to their CSS selectors.
+    """
+    products = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = orjson.loads(script.string or "")
+        except orjson.JSONDecodeError:
+            continue
+        nodes = data if isinstance(data, list) else [data]
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            if node.get("@type") == "ItemList":
+                items = [e.get("item", e) for e in node.get("itemListElement", []) if isinstance(e, dict)]
+            else:
+                items = [node]
+            for it in items:
+                if not isinstance(it, dict) or it.get("@type") != "Product" or not it.get("name"):
+                    continue
+                offers = it.get("offers") or {}
+                if isinstance(offers, list):
+                    offers = offers[0] if offers else {}
+                rating = it.get("aggregateRating") or {}
+                image  = it.get("image")
+                url_   = it.get("url") or ""
+                if url_.startswith("/"):
+                    url_ = base_url + url_
+                price   = _num(offers.get("price") or offers.get("lowPrice"))
+                mrp     = _num(offers.get("highPrice"))
+                reviews = _num(rating.get("reviewCount") or rating.get("ratingCount"))
+                products.append({
+                    "title":        it["name"],
+                    "platform":     platform,
+                    "url":          url_,
+                    "price":        price,
+                    "mrp":          mrp,
+                    "discount_pct": round((mrp - price) / mrp * 100, 1) if mrp and price and mrp > price else None,
+                    "rating":       _num(rating.get("ratingValue")),
+                    "review_count": int(reviews) if reviews else None,
+                    "image_url":    image[0] if isinstance(image, list) and image else image,
+                    "stock_status": "Out of Stock" if "OutOfStock" in str(offers.get("availability", "")) else "In Stock",
+                })
+    return products
+
+
+def _myntra_state_products(soup) -> list[dict]:
+    """Products from Myntra's inline `window.__myx = {...}` search state."""
+    for script in soup.find_all("script"):
+        text = script.string or ""
+        if "window.__myx" not in text:
+            continue
+        try:
+            state = orjson.loads(text.split("=", 1)[1].strip().rstrip(";"))
+        except (IndexError, orjson.JSONDecodeError):
+            return []
+        results = ((state.get("searchData") or {}).get("results") or {}).get("products") or []
+        products = []
+        for it in results:
+            price, mrp = _num(it.get("price")), _num(it.get("mrp"))
+            href = it.get("landingPageUrl") or ""
+            products.append({
+                "title":        f"{it.get('brand', '')} {it.get('productName') or it.get('product', '')}".strip(),
+                "platform":     "myntra",
+                "url":          href if href.startswith("http") else f"https://www.myntra.com/{href}",
+                "price":        price,
+                "mrp":          mrp,
+                "discount_pct": round((mrp - price) / mrp * 100, 1) if mrp and price and mrp > price else None,
+                "rating":       _num(it.get("rating")) or None,
+                "review_count": it.get("ratingCount") or None,
+                "image_url":    it.get("searchImage"),
+                "stock_status": "In Stock",
+            })
+        return products
+    return []
+
+
 # ── AMAZON ────────────────────────────────────
-def scrape_amazon(niche: str) -> list[dict]:
+_AMZ_SEL = {
+    "items": sv.compile('[data-component-type="s-search-result"]'),
+    "title": sv.compile("h2 a span"),
+    "link": sv.compile("h2 a"),
+    "price": sv.compile(".a-price-whole"),
+    "mrp": sv.compile(".a-text-price span"),
+    "rating": sv.compile(".a-icon-star-small .a-icon-alt, .a-icon-alt"),
+    "review": sv.compile(".a-size-small .a-link-normal span"),
+    "image": sv.compile(".s-image"),
+    "badge": sv.compile(".a-badge-text"),
+}
+
+
+async def scrape_amazon(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "+")
 
@@ -179,21 +423,31 @@ def scrape_amazon(niche: str) -> list[dict]:
         f"https://www.amazon.in/s?k={encoded}&sort=popularity-rank",
     ]
 
-    for url in urls:
-        soup = _safe_get(url)
+    # Both sort orders in flight together; _pace_host still spaces the hits
+    soups = await asyncio.gather(*(_safe_get(client, u) for u in urls))
+    for soup in soups:
         if not soup:
             continue
 
-        items = soup.select('[data-component-type="s-search-result"]')
+        structured = _jsonld_products(soup, "amazon", "https://www.amazon.in")[:15]
+        if structured:
+            for p in structured:
+                m = _ASIN_RE.search(p["url"])
+                p["asin"] = m.group(1) if m else ""
+                p["badges"] = {}
+            products += structured
+            continue
+
+        items = _AMZ_SEL["items"].select(soup)
         for item in items[:15]:
             try:
-                title_el   = item.select_one("h2 a span")
-                link_el    = item.select_one("h2 a")
-                price_el   = item.select_one(".a-price-whole")
-                mrp_el     = item.select_one(".a-text-price span")
-                rating_el  = item.select_one(".a-icon-star-small .a-icon-alt, .a-icon-alt")
-                review_el  = item.select_one(".a-size-small .a-link-normal span")
-                image_el   = item.select_one(".s-image")
+                title_el   = _AMZ_SEL["title"].select_one(item)
+                link_el    = _AMZ_SEL["link"].select_one(item)
+                price_el   = _AMZ_SEL["price"].select_one(item)
+                mrp_el     = _AMZ_SEL["mrp"].select_one(item)
+                rating_el  = _AMZ_SEL["rating"].select_one(item)
+                review_el  = _AMZ_SEL["review"].select_one(item)
+                image_el   = _AMZ_SEL["image"].select_one(item)
                 asin       = item.get("data-asin", "")
 
                 if not title_el or not link_el:
@@ -206,7 +460,7 @@ def scrape_amazon(niche: str) -> list[dict]:
 
                 # Badges
                 badges = {
-                    "bestseller":    bool(item.select_one(".a-badge-text")),
+                    "bestseller":    bool(_AMZ_SEL["badge"].select_one(item)),
                     "amazons_choice": "Amazon's Choice" in item.get_text(),
                     "deal_of_day":   "Deal of the Day" in item.get_text(),
                 }
@@ -228,33 +482,53 @@ def scrape_amazon(niche: str) -> list[dict]:
             except Exception as e:
                 logger.debug(f"Amazon parse error: {e}")
 
+    for soup in soups:
+        if soup:
+            soup.decompose()
     return products
 
 
 # ── FLIPKART ──────────────────────────────────
-def scrape_flipkart(niche: str) -> list[dict]:
+_FK_SEL = {
+    # Card markup varies by category — first one that matches wins
+    "cards": tuple(sv.compile(c) for c in ("div[data-id]", "._1AtVbE", "._13oc-S")),
+    "title": sv.compile("a.s1Q9rs, ._4rR01T, .IRpwTa, a[title]"),
+    "link": sv.compile("a.s1Q9rs, ._4rR01T, a[href*='/p/']"),
+    "price": sv.compile("._30jeq3, ._1_WHN1"),
+    "mrp": sv.compile("._3I9_wc, ._2p6lqe"),
+    "rating": sv.compile("._3LWZlK"),
+    "image": sv.compile("img._396cs4, img._2r_T1I"),
+}
+
+
+async def scrape_flipkart(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "%20")
     url      = f"https://www.flipkart.com/search?q={encoded}&sort=popularity"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
+    structured = _jsonld_products(soup, "flipkart", "https://www.flipkart.com")
+    if structured:
+        soup.decompose()
+        return structured[:15]
+
     # Flipkart product cards vary by category
-    for selector in ["div[data-id]", "._1AtVbE", "._13oc-S"]:
-        items = soup.select(selector)
+    for selector in _FK_SEL["cards"]:
+        items = selector.select(soup)
         if items:
             break
 
     for item in items[:15]:
         try:
-            title_el  = item.select_one("a.s1Q9rs, ._4rR01T, .IRpwTa, a[title]")
-            link_el   = item.select_one("a.s1Q9rs, ._4rR01T, a[href*='/p/']")
-            price_el  = item.select_one("._30jeq3, ._1_WHN1")
-            mrp_el    = item.select_one("._3I9_wc, ._2p6lqe")
-            rating_el = item.select_one("._3LWZlK")
-            image_el  = item.select_one("img._396cs4, img._2r_T1I")
+            title_el  = _FK_SEL["title"].select_one(item)
+            link_el   = _FK_SEL["link"].select_one(item)
+            price_el  = _FK_SEL["price"].select_one(item)
+            mrp_el    = _FK_SEL["mrp"].select_one(item)
+            rating_el = _FK_SEL["rating"].select_one(item)
+            image_el  = _FK_SEL["image"].select_one(item)
 
             if not title_el:
                 continue
@@ -276,33 +550,51 @@ def scrape_flipkart(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"Flipkart parse error: {e}")
 
+    soup.decompose()
     return products
 
 
 # ── MYNTRA ────────────────────────────────────
-def scrape_myntra(niche: str) -> list[dict]:
+_MYN_SEL = {
+    "items": sv.compile(".product-base"),
+    "title": sv.compile(".product-brand, .product-product"),
+    "price": sv.compile(".product-discountedPrice, .product-price"),
+    "mrp": sv.compile(".product-strike"),
+    "image": sv.compile("picture source, img.img-responsive"),
+    "link": sv.compile("a"),
+    "brand": sv.compile(".product-brand"),
+    "name": sv.compile(".product-product"),
+}
+
+
+async def scrape_myntra(client: httpx.AsyncClient, niche: str) -> list[dict]:
     # Myntra requires JavaScript — returns minimal data via basic GET
     products = []
     encoded  = niche.replace(" ", "-").lower()
     url      = f"https://www.myntra.com/{encoded}"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
-    for item in soup.select(".product-base")[:15]:
+    structured = _myntra_state_products(soup) or _jsonld_products(soup, "myntra", "https://www.myntra.com")
+    if structured:
+        soup.decompose()
+        return structured[:15]
+
+    for item in _MYN_SEL["items"].select(soup)[:15]:
         try:
-            title_el     = item.select_one(".product-brand, .product-product")
-            price_el     = item.select_one(".product-discountedPrice, .product-price")
-            mrp_el       = item.select_one(".product-strike")
-            image_el     = item.select_one("picture source, img.img-responsive")
-            link_el      = item.select_one("a")
+            title_el     = _MYN_SEL["title"].select_one(item)
+            price_el     = _MYN_SEL["price"].select_one(item)
+            mrp_el       = _MYN_SEL["mrp"].select_one(item)
+            image_el     = _MYN_SEL["image"].select_one(item)
+            link_el      = _MYN_SEL["link"].select_one(item)
 
             if not title_el:
                 continue
 
-            brand  = item.select_one(".product-brand")
-            name_  = item.select_one(".product-product")
+            brand  = _MYN_SEL["brand"].select_one(item)
+            name_  = _MYN_SEL["name"].select_one(item)
             title  = f"{brand.get_text(strip=True)} {name_.get_text(strip=True)}" if brand and name_ else title_el.get_text(strip=True)
             href   = link_el.get("href") if link_el else ""
             full_url = f"https://www.myntra.com/{href}" if not href.startswith("http") else href
@@ -319,25 +611,35 @@ def scrape_myntra(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"Myntra parse error: {e}")
 
+    soup.decompose()
     return products
 
 
 # ── MEESHO ────────────────────────────────────
-def scrape_meesho(niche: str) -> list[dict]:
+_MEE_SEL = {
+    "items": sv.compile("[class*='ProductList__GridCol'], [data-testid='product-card']"),
+    "title": sv.compile("p[class*='Text'], h2"),
+    "price": sv.compile("h5[class*='Text'], [class*='price']"),
+    "image": sv.compile("img"),
+    "link": sv.compile("a"),
+}
+
+
+async def scrape_meesho(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "%20")
     url      = f"https://www.meesho.com/search?q={encoded}"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
-    for item in soup.select("[class*='ProductList__GridCol'], [data-testid='product-card']")[:15]:
+    for item in _MEE_SEL["items"].select(soup)[:15]:
         try:
-            title_el = item.select_one("p[class*='Text'], h2")
-            price_el = item.select_one("h5[class*='Text'], [class*='price']")
-            image_el = item.select_one("img")
-            link_el  = item.select_one("a")
+            title_el = _MEE_SEL["title"].select_one(item)
+            price_el = _MEE_SEL["price"].select_one(item)
+            image_el = _MEE_SEL["image"].select_one(item)
+            link_el  = _MEE_SEL["link"].select_one(item)
 
             if not title_el:
                 continue
@@ -356,25 +658,35 @@ def scrape_meesho(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"Meesho parse error: {e}")
 
+    soup.decompose()
     return products
 
 
 # ── AJIO ──────────────────────────────────────
-def scrape_ajio(niche: str) -> list[dict]:
+_AJIO_SEL = {
+    "items": sv.compile(".item, .rizz-product-base"),
+    "title": sv.compile(".nameCls, .brand, h2"),
+    "price": sv.compile(".price, .original-price span"),
+    "image": sv.compile("img"),
+    "link": sv.compile("a"),
+}
+
+
+async def scrape_ajio(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "+")
     url      = f"https://www.ajio.com/search/?text={encoded}"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
-    for item in soup.select(".item, .rizz-product-base")[:15]:
+    for item in _AJIO_SEL["items"].select(soup)[:15]:
         try:
-            title_el = item.select_one(".nameCls, .brand, h2")
-            price_el = item.select_one(".price, .original-price span")
-            image_el = item.select_one("img")
-            link_el  = item.select_one("a")
+            title_el = _AJIO_SEL["title"].select_one(item)
+            price_el = _AJIO_SEL["price"].select_one(item)
+            image_el = _AJIO_SEL["image"].select_one(item)
+            link_el  = _AJIO_SEL["link"].select_one(item)
 
             if not title_el:
                 continue
@@ -393,25 +705,35 @@ def scrape_ajio(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"Ajio parse error: {e}")
 
+    soup.decompose()
     return products
 
 
 # ── NYKAA ─────────────────────────────────────
-def scrape_nykaa(niche: str) -> list[dict]:
+_NYK_SEL = {
+    "items": sv.compile(".productWrapper, .css-1ol9jjv"),
+    "title": sv.compile(".productName, h3"),
+    "price": sv.compile(".offerPrice, .price"),
+    "image": sv.compile("img"),
+    "link": sv.compile("a"),
+}
+
+
+async def scrape_nykaa(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "%20")
     url      = f"https://www.nykaa.com/search/result/?q={encoded}&sort=popularity"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
-    for item in soup.select(".productWrapper, .css-1ol9jjv")[:15]:
+    for item in _NYK_SEL["items"].select(soup)[:15]:
         try:
-            title_el = item.select_one(".productName, h3")
-            price_el = item.select_one(".offerPrice, .price")
-            image_el = item.select_one("img")
-            link_el  = item.select_one("a")
+            title_el = _NYK_SEL["title"].select_one(item)
+            price_el = _NYK_SEL["price"].select_one(item)
+            image_el = _NYK_SEL["image"].select_one(item)
+            link_el  = _NYK_SEL["link"].select_one(item)
 
             if not title_el:
                 continue
@@ -430,25 +752,35 @@ def scrape_nykaa(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"Nykaa parse error: {e}")
 
+    soup.decompose()
     return products
 
 
 # ── FIRSTCRY ──────────────────────────────────
-def scrape_firstcry(niche: str) -> list[dict]:
+_FC_SEL = {
+    "items": sv.compile(".product-box, .prd-box"),
+    "title": sv.compile(".prd-name, h2, .product-name"),
+    "price": sv.compile(".prd-price, .special-price"),
+    "image": sv.compile("img"),
+    "link": sv.compile("a"),
+}
+
+
+async def scrape_firstcry(client: httpx.AsyncClient, niche: str) -> list[dict]:
     products = []
     encoded  = niche.replace(" ", "+")
     url      = f"https://www.firstcry.com/search?q={encoded}&sort=popularity"
 
-    soup = _safe_get(url)
+    soup = await _safe_get(client, url)
     if not soup:
         return []
 
-    for item in soup.select(".product-box, .prd-box")[:15]:
+    for item in _FC_SEL["items"].select(soup)[:15]:
         try:
-            title_el = item.select_one(".prd-name, h2, .product-name")
-            price_el = item.select_one(".prd-price, .special-price")
-            image_el = item.select_one("img")
-            link_el  = item.select_one("a")
+            title_el = _FC_SEL["title"].select_one(item)
+            price_el = _FC_SEL["price"].select_one(item)
+            image_el = _FC_SEL["image"].select_one(item)
+            link_el  = _FC_SEL["link"].select_one(item)
 
             if not title_el:
                 continue
@@ -467,12 +799,58 @@ def scrape_firstcry(niche: str) -> list[dict]:
         except Exception as e:
             logger.debug(f"FirstCry parse error: {e}")
 
+    soup.decompose()
     return products
 
 
+# ──────────────────────────────────────────────
+# DEDUP
+# ──────────────────────────────────────────────
+_NON_WORD_RE = re.compile(r"\W+")
+
+
+def _dedupe_products(products: list[dict]) -> list[dict]:
+    """
+    Drop exact repeats of (platform, asin or url), keeping the first listing.
+    Link-less cards fall back to their normalised title; with no title either they're kept.
+    """
+    seen = set()
+    unique = []
+    for p in products:
+        ident = p.get("asin") or p.get("url")
+        if not ident:
+            title = _NON_WORD_RE.sub("", (p.get("title") or "").lower())
+            if not title:
+                unique.append(p)
+                continue
+            ident = ("title", title)
+        key = (p.get("platform"), ident)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(p)
+    return unique
+
+
 # ──────────────────────────────────────────────
 # PRODUCT SCORING ENGINE
 # ──────────────────────────────────────────────
+# Affiliate commission % by platform, and the score points each rate earns
+COMMISSION_PCT = {
+    "amazon":   12.0,
+    "myntra":   15.0,
+    "meesho":   18.0,
+    "flipkart": 10.0,
+    "ajio":     14.0,
+    "nykaa":    12.0,
+    "firstcry": 10.0,
+}
+DEFAULT_COMMISSION_PCT = 10.0
+_COMMISSION_POINTS = {
+    pct: min(25, pct * 1.5) for pct in {*COMMISSION_PCT.values(), DEFAULT_COMMISSION_PCT}
+}
+
+
 def _score_products(
     products: list[dict],
     niche: str,
@@ -484,30 +862,18 @@ def _score_products(
     Score each product 0–100 based on:
     commission, rating, reviews, price, stock, trends.
     """
-    trending_keywords = set(
-        (kw.lower() for kw in pinterest_data.get("trending_keywords", []))
-    )
+    trending_keywords = {kw.lower() for kw in pinterest_data.get("trending_keywords", [])}
+    trending_re = _keyword_re(trending_keywords) if trending_keywords else None
     is_google_trending = trends_data.get("is_trending", False)
 
     for p in products:
         score = 0.0
 
         # 1. COMMISSION POTENTIAL (up to 25 pts)
-        platform = p.get("platform", "").lower()
-        commission_map = {
-            "amazon":   12.0,
-            "myntra":   15.0,
-            "meesho":   18.0,
-            "flipkart": 10.0,
-            "ajio":     14.0,
-            "nykaa":    12.0,
-            "firstcry": 10.0,
-        }
-        commission_pct = commission_map.get(platform, 10.0)
+        commission_pct = COMMISSION_PCT.get(p.get("platform", "").lower(), DEFAULT_COMMISSION_PCT)
         price = p.get("price") or 0
-        est_commission = round(price * commission_pct / 100, 2)
-        p["commission_estimate"] = est_commission
-        score += min(25, commission_pct * 1.5)
+        p["commission_estimate"] = round(price * commission_pct / 100, 2)
+        score += _COMMISSION_POINTS[commission_pct]
 
         # 2. RATING (up to 20 pts)
         rating = p.get("rating") or 0
@@ -546,7 +912,7 @@ def _score_products(
         if is_google_trending:
             score += 10
         title_lower = p.get("title", "").lower()
-        if any(kw in title_lower for kw in trending_keywords):
+        if trending_re and trending_re.search(title_lower):
             score += 8
         badges = p.get("badges", {})
         if isinstance(badges, dict):
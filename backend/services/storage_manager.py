@@ -1,25 +1,38 @@
 """Storage Manager — Supabase Storage for pin images."""
 import os
+import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
 
 logger = logging.getLogger(__name__)
 
+REMOVE_BATCH_SIZE = 100
+
+
+def _public_url(filename: str) -> str:
+    project_ref = os.getenv("SUPABASE_URL", "").replace("https://", "").split(".")[0]
+    return f"https://{project_ref}.supabase.co/storage/v1/object/public/pin-images/{filename}"
+
 
 async def upload_pin_image(file_bytes: bytes, filename: str, content_type: str = "image/jpeg") -> tuple[str | None, str]:
-    """Upload image to Supabase Storage pin-images bucket. Returns (url, error_message)."""
+    """Upload image to Supabase Storage pin-images bucket. Returns (url, error_message).
+
+    Skips the transfer when an object with this name already exists, so
+    content-addressed filenames make retried uploads free.
+    """
     try:
         from services.supabase_client import get_supabase
         sb = get_supabase()
         storage = sb.storage.from_("pin-images")
-        storage.upload(
+        if await asyncio.to_thread(storage.exists, filename):
+            return _public_url(filename), "exists"
+        await asyncio.to_thread(
+            storage.upload,
             path=filename,
             file=file_bytes,
             file_options={"content-type": content_type},
         )
-        project_ref = os.getenv("SUPABASE_URL", "").replace("https://", "").split(".")[0]
-        public_url = f"https://{project_ref}.supabase.co/storage/v1/object/public/pin-images/{filename}"
-        return public_url, "ok"
+        return _public_url(filename), "ok"
     except Exception as e:
         logger.error(f"Supabase Storage upload failed: {e}")
         return None, str(e)
@@ -31,21 +44,41 @@ async def delete_old_images(days: int = 7) -> tuple[int, str]:
         from services.supabase_client import get_supabase
         sb = get_supabase()
         storage = sb.storage.from_("pin-images")
-        files = storage.list()
+        files = await asyncio.to_thread(storage.list)
 
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        deleted = 0
+        # Storage returns UTC "...Z" timestamps, which order lexicographically
+        cutoff_iso = cutoff.isoformat().replace("+00:00", "Z")
+        to_delete = []
 
         for f in files:
             created = f.get("created_at") or f.get("updated_at")
-            if created:
-                try:
-                    file_dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-                    if file_dt < cutoff:
-                        storage.remove([f["name"]])
-                        deleted += 1
-                except Exception:
-                    pass
+            if not created:
+                continue
+            if created.endswith("Z"):
+                if created < cutoff_iso:
+                    to_delete.append(f["name"])
+                continue
+            try:
+                file_dt = datetime.fromisoformat(created)
+                if file_dt.tzinfo is None:
+                    file_dt = file_dt.replace(tzinfo=timezone.utc)
+                if file_dt < cutoff:
+                    to_delete.append(f["name"])
+            except ValueError:
+                pass
+
+        # remove() takes a list of paths — one request per batch, not per file
+        deleted = 0
+        for i in range(0, len(to_delete), REMOVE_BATCH_SIZE):
+            batch = to_delete[i:i + REMOVE_BATCH_SIZE]
+            try:
+                await asyncio.to_thread(storage.remove, batch)
+            except Exception as e:
+                # Skip this batch; the next cleanup run picks its files up again
+                logger.warning(f"Could not delete {len(batch)} images: {e}")
+                continue
+            deleted += len(batch)
 
         msg = f"Deleted {deleted} images older than {days} days."
         logger.info(msg)
@@ -61,7 +94,7 @@ async def get_storage_usage() -> dict:
         from services.supabase_client import get_supabase
         sb = get_supabase()
         storage = sb.storage.from_("pin-images")
-        files = storage.list()
+        files = await asyncio.to_thread(storage.list)
 
         total_bytes = sum(f.get("metadata", {}).get("size", 0) for f in files if f.get("metadata"))
         total_mb = round(total_bytes / (1024 * 1024), 2)
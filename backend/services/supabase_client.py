@@ -3,63 +3,137 @@ Supabase Client — Central connection to Supabase PostgreSQL + Storage.
 Handles retries, connection pooling, and write queue for resilience.
 """
 import os
+import random
 import time
-import json
 import logging
 import asyncio
+from collections import defaultdict, deque
 from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+from postgrest.exceptions import APIError
+
+try:
+    import fcntl  # POSIX only; without it a single worker is assumed
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
 _supabase_client = None
-_write_queue: list[dict] = []  # In-memory queue for failed writes
+_http_client = None  # Shared keep-alive pool for PostgREST/Storage/Auth
+_write_queue: deque[dict] = deque()  # In-memory FIFO of failed writes
+
+# Past MAX_IN_MEM queued writes, overflow is appended to a JSONL spill file
+MAX_IN_MEM = 10_000
+SPILL_CHUNK = 500
+SPILL_PATH = Path(os.getenv("WRITE_QUEUE_SPILL_PATH", "/tmp/pinprofit_wq.jsonl"))
+SPILL_LOCK_PATH = SPILL_PATH.with_suffix(".lock")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
 
 
+def _build_http_client():
+    """HTTP/2 client with keep-alive so calls skip the TCP + TLS handshake."""
+    import httpx
+    return httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(30, connect=10),
+        limits=httpx.Limits(
+            max_connections=50,
+            max_keepalive_connections=20,
+            keepalive_expiry=60,
+        ),
+    )
+
+
 def get_supabase():
-    """Get or create Supabase client singleton."""
-    global _supabase_client
-    if _supabase_client is None:
-        url = os.getenv("SUPABASE_URL", SUPABASE_URL)
-        key = os.getenv("SUPABASE_SERVICE_KEY", SUPABASE_SERVICE_KEY)
-        if not url or not key:
-            raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
-        from supabase import create_client
-        _supabase_client = create_client(url, key)
-        logger.info("Supabase client initialized.")
+    """Get or create Supabase client singleton.
+
+    Built once per process; every later call is a plain global read.
+    Use reset_client() to rebuild it (credential change, tests).
+    """
+    if _supabase_client is not None:
+        return _supabase_client
+    return _create_client()
+
+
+def _create_client():
+    global _supabase_client, _http_client
+    url = os.getenv("SUPABASE_URL", SUPABASE_URL)
+    key = os.getenv("SUPABASE_SERVICE_KEY", SUPABASE_SERVICE_KEY)
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+    from supabase import create_client, ClientOptions
+    _http_client = _build_http_client()
+    _supabase_client = create_client(url, key, options=ClientOptions(httpx_client=_http_client))
+    logger.info("Supabase client initialized.")
     return _supabase_client
 
 
 def reset_client():
     """Force-reset the client (e.g. after credential change)."""
-    global _supabase_client
+    global _supabase_client, _http_client
     _supabase_client = None
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
 
 
 # ── Retry Helper ──────────────────────────────
 
-def with_retry(fn, max_retries=3, backoff_times=(5, 15, 45)):
-    """Execute a supabase operation with exponential backoff."""
-    last_err = None
+def _backoff(attempt: int, base: float, cap: float) -> float:
+    """Capped exponential delay with jitter, so failed callers don't retry in lockstep."""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+async def with_retry_async(fn, max_retries=3, base=0.5, cap=30, retry_on=(Exception,)):
+    """Await fn() — a zero-arg callable returning a coroutine — with jittered backoff."""
+    for attempt in range(max_retries):
+        try:
+            return await fn()
+        except retry_on as e:
+            if attempt == max_retries - 1:
+                logger.error(f"Operation failed after {max_retries} attempts: {e}")
+                raise
+            wait = _backoff(attempt, base, cap)
+            logger.warning(f"Operation failed (attempt {attempt+1}): {e}. Retrying in {wait:.1f}s...")
+            await asyncio.sleep(wait)
+
+
+def with_retry(fn, max_retries=3, base=5, cap=45):
+    """Blocking variant for scripts/threads only — never call on the event loop."""
     for attempt in range(max_retries):
         try:
             return fn()
         except Exception as e:
-            last_err = e
-            wait = backoff_times[attempt] if attempt < len(backoff_times) else 45
-            logger.warning(f"Supabase operation failed (attempt {attempt+1}): {e}. Retrying in {wait}s...")
+            if attempt == max_retries - 1:
+                logger.error(f"Supabase operation failed after {max_retries} retries: {e}")
+                raise
+            wait = _backoff(attempt, base, cap)
+            logger.warning(f"Supabase operation failed (attempt {attempt+1}): {e}. Retrying in {wait:.1f}s...")
             time.sleep(wait)
-    logger.error(f"Supabase operation failed after {max_retries} retries: {last_err}")
-    raise last_err
 
 
 # ── Write Queue (for resilience) ──────────────
 
+def _enqueue(item: dict):
+    """Hold the item in memory up to MAX_IN_MEM; past that, append it to the spill file."""
+    if len(_write_queue) < MAX_IN_MEM:
+        _write_queue.append(item)
+        return
+    try:
+        with SPILL_PATH.open("ab") as f:
+            f.write(orjson.dumps(item, default=str) + b"\n")
+    except OSError as e:
+        logger.error(f"Write queue full and spill failed, dropping {item['operation']} to {item['table']}: {e}")
+
+
 def queue_write(table: str, operation: str, data: dict):
     """Queue a write operation if Supabase is unreachable."""
-    _write_queue.append({
+    _enqueue({
         "table": table,
         "operation": operation,
         "data": data,
@@ -68,31 +142,137 @@ def queue_write(table: str, operation: str, data: dict):
     logger.warning(f"Queued {operation} to {table} — will retry. Queue size: {len(_write_queue)}")
 
 
+def _take_spill():
+    """
+    Claim the spill file for this flush; new spills start a fresh file.
+    Every worker process shares SPILL_PATH, so the claim is held under an
+    exclusive flock — returns (path, lock_file), or None when there is
+    nothing to drain or another worker is already draining it.
+    """
+    try:
+        lock = SPILL_LOCK_PATH.open("ab")
+    except OSError:
+        return None
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        claimed = SPILL_PATH.with_suffix(".flushing")
+        if not claimed.exists():  # else: left over from an interrupted flush
+            os.replace(SPILL_PATH, claimed)
+        return claimed, lock
+    except (BlockingIOError, FileNotFoundError):
+        lock.close()
+        return None
+
+
+def _read_spill_chunk(f, n: int) -> list[dict]:
+    items = []
+    for line in f:
+        try:
+            items.append(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            continue  # torn write — skip the line
+        if len(items) >= n:
+            break
+    return items
+
+
+async def _flush_items(sb, pending: list[dict]) -> list[dict]:
+    """Send one group of queued writes; returns the items that still failed."""
+    batches = defaultdict(list)
+    updates = []
+    for item in pending:
+        op = item["operation"]
+        if op in ("insert", "upsert"):
+            batches[(item["table"], op, tuple(sorted(item["data"])))].append(item)
+        elif op == "update":
+            updates.append(item)
+
+    def _run_batch(table, op, items):
+        rows = [i["data"] for i in items]
+        if op == "upsert":
+            # Postgres rejects an upsert that hits one row twice — latest queued write wins
+            rows = list({r.get("id", r.get("key", n)): r for n, r in enumerate(rows)}.values())
+        q = sb.table(table)
+        (q.insert(rows) if op == "insert" else q.upsert(rows)).execute()
+
+    def _run_update(item):
+        # data must have an "id" or "key" field for the match
+        data = dict(item["data"])
+        match_key = data.pop("_match_key", "id")
+        match_val = data.pop("_match_val", None)
+        if match_val:
+            sb.table(item["table"]).update(data).eq(match_key, match_val).execute()
+
+    def _run_rows(table, op, items):
+        # Bulk write failed — one row at a time so only the bad rows stay queued
+        bad = []
+        for n, item in enumerate(items):
+            try:
+                _run_batch(table, op, [item])
+            except APIError as e:
+                logger.warning(f"Queued {op} into {table} rejected: {e}")
+                bad.append(item)
+            except Exception:
+                # Not a row problem (network, auth) — keep the rest queued as they are
+                return bad + items[n:]
+        return bad
+
+    def _retried(fn, *args):
+        return with_retry_async(lambda: asyncio.to_thread(fn, *args))
+
+    jobs = [(items, (t, op), _retried(_run_batch, t, op, items)) for (t, op, _), items in batches.items()]
+    jobs += [([item], None, _retried(_run_update, item)) for item in updates]
+    results = await asyncio.gather(*(j for _, _, j in jobs), return_exceptions=True)
+
+    failed = []
+    for (items, batch, _), res in zip(jobs, results):
+        if not isinstance(res, Exception):
+            continue
+        logger.warning(f"Queue flush failed for {items[0]['table']} ({len(items)} rows): {res}")
+        if batch is not None and len(items) > 1:
+            failed.extend(await asyncio.to_thread(_run_rows, *batch, items))
+        else:
+            failed.extend(items)
+    return failed
+
+
 async def flush_write_queue():
-    """Retry all queued writes. Called periodically by scheduler."""
-    if not _write_queue:
+    """Retry all queued writes. Called periodically by scheduler.
+
+    Spilled writes go first, SPILL_CHUNK at a time. Inserts/upserts go out
+    as one bulk request per (table, operation, column set); updates need
+    their own .eq() match, so they run concurrently instead.
+    """
+    taken = await asyncio.to_thread(_take_spill)
+    if not _write_queue and taken is None:
         return
-    logger.info(f"Flushing {len(_write_queue)} queued writes...")
     failed = []
-    sb = get_supabase()
-    for item in _write_queue:
+
+    if taken is not None:
+        spill, lock = taken
         try:
-            table = sb.table(item["table"])
-            if item["operation"] == "insert":
-                table.insert(item["data"]).execute()
-            elif item["operation"] == "upsert":
-                table.upsert(item["data"]).execute()
-            elif item["operation"] == "update":
-                # data must have an "id" or "key" field for the match
-                match_key = item["data"].pop("_match_key", "id")
-                match_val = item["data"].pop("_match_val", None)
-                if match_val:
-                    table.update(item["data"]).eq(match_key, match_val).execute()
-        except Exception as e:
-            logger.warning(f"Queue flush failed for {item['table']}: {e}")
-            failed.append(item)
-    _write_queue.clear()
-    _write_queue.extend(failed)
+            sb = get_supabase()
+            with await asyncio.to_thread(spill.open, "rb") as f:
+                while chunk := await asyncio.to_thread(_read_spill_chunk, f, SPILL_CHUNK):
+                    logger.info(f"Flushing {len(chunk)} spilled writes...")
+                    failed += await _flush_items(sb, chunk)
+            await asyncio.to_thread(spill.unlink, missing_ok=True)
+        finally:
+            lock.close()  # releases the flock
+    sb = get_supabase()
+
+    # Take the current backlog; writes queued while we flush wait for the next run
+    pending = [_write_queue.popleft() for _ in range(len(_write_queue))]
+    if pending:
+        logger.info(f"Flushing {len(pending)} queued writes...")
+        failed += await _flush_items(sb, pending)
+
+    # Failures go back to the front, ahead of anything queued meanwhile
+    room = max(0, MAX_IN_MEM - len(_write_queue))
+    _write_queue.extendleft(reversed(failed[:room]))
+    for item in failed[room:]:
+        _enqueue(item)
     if failed:
         logger.warning(f"{len(failed)} writes still queued.")
     else:
@@ -108,11 +288,25 @@ def supabase_storage():
 
 # ── Connection Test ───────────────────────────
 
+# A query that succeeded this recently already proves connectivity
+CONNECTION_OK_TTL = 15
+_last_ok_ts = 0.0
+
+
+def note_connection_ok():
+    """Record a successful Supabase round-trip so test_connection can skip its probe."""
+    global _last_ok_ts
+    _last_ok_ts = time.monotonic()
+
+
 def test_connection() -> tuple[bool, str]:
     """Test Supabase connectivity."""
+    if time.monotonic() - _last_ok_ts < CONNECTION_OK_TTL:
+        return True, "Supabase connected successfully"
     try:
         sb = get_supabase()
-        result = sb.table("settings").select("key").limit(1).execute()
+        sb.table("settings").select("key").limit(1).execute()
+        note_connection_ok()
         return True, "Supabase connected successfully"
     except Exception as e:
         return False, f"Supabase connection failed: {str(e)}"
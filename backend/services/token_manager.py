@@ -4,60 +4,194 @@ All state stored in Supabase (evolution_strategy_memory table).
 Replaces Cloudinary monitoring with Supabase Storage monitoring.
 """
 import os
-import json
+import time
+import hashlib
+import asyncio
 import logging
+import threading
 from datetime import datetime, timezone, timedelta
 
+import aiosmtplib
 import httpx
+import orjson
+
+from services.http_client import get_http_client
+from services.supabase_client import with_retry_async
 
 logger = logging.getLogger(__name__)
 
+# The shared client's transport already retries connect failures and 429s, so this
+# layer only covers errors after the request went out — no failure is retried twice.
+# Used for the idempotent GETs only; the refresh POST is never resent.
+_TRANSIENT = (httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError, httpx.ReadTimeout, httpx.WriteTimeout)
 
-# ── State persistence in Supabase ─────────────
+GMAIL_RECHECK = timedelta(hours=24)
 
-def _load_state() -> dict:
-    """Load token health state from Supabase."""
+
+# ── State persistence in Supabase ─────────────
+# One cached copy per process: reads within STATE_CACHE_TTL skip Supabase,
+# and the usage trackers only mark it dirty — run_state_flusher() writes it
+# out STATE_FLUSH_DELAY after the first bump, so a burst costs one upsert.
+STATE_CACHE_TTL = 60
+STATE_FLUSH_DELAY = 5
+STATE_FLUSH_RETRY = 60
+
+_state_cache: dict | None = None
+_state_loaded_at = 0.0
+_state_dirty = False
+_state_lock = threading.Lock()
+_flush_event = asyncio.Event()
+_flush_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _fetch_state() -> dict:
     try:
         from services.supabase_client import get_supabase
         r = get_supabase().table("evolution_strategy_memory").select("value").eq("key", "_token_health_state").execute()
         if r.data:
-            return json.loads(r.data[0]["value"])
+            return orjson.loads(r.data[0]["value"])
     except Exception:
         pass
     return {}
 
 
+def _load_state() -> dict:
+    """Load token health state (cached; never reloaded over unsaved changes)."""
+    global _state_cache, _state_loaded_at
+    with _state_lock:
+        if _state_cache is not None and (_state_dirty or time.monotonic() - _state_loaded_at < STATE_CACHE_TTL):
+            return _state_cache
+    state = _fetch_state()
+    with _state_lock:
+        if _state_dirty and _state_cache is not None:
+            return _state_cache  # a tracker wrote while we fetched
+        _state_cache, _state_loaded_at = state, time.monotonic()
+        return state
+
+
+def _write_state(state: dict):
+    from services.supabase_client import get_supabase
+    get_supabase().table("evolution_strategy_memory").upsert({
+        "key": "_token_health_state",
+        "value": orjson.dumps(state, default=str).decode(),  # text column
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).execute()
+
+
 def _save_state(state: dict):
-    """Persist token health state to Supabase."""
+    """Persist token health state to Supabase (write-through)."""
+    global _state_cache, _state_loaded_at, _state_dirty
+    with _state_lock:
+        _state_cache, _state_loaded_at, _state_dirty = state, time.monotonic(), False
+        snapshot = dict(state)
     try:
-        from services.supabase_client import get_supabase
-        get_supabase().table("evolution_strategy_memory").upsert({
-            "key": "_token_health_state",
-            "value": json.dumps(state, default=str),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }).execute()
+        _write_state(snapshot)
     except Exception as e:
+        with _state_lock:
+            _state_dirty = True  # keep it for the next flush_state()
+        logger.warning(f"Could not save token health state: {e}")
+
+
+def _bump_state(update):
+    """Apply update(state) to the cached state and mark it for the next flush."""
+    global _state_dirty
+    state = _load_state()
+    with _state_lock:
+        result = update(state)
+        _state_dirty = True
+    _wake_flusher()
+    return result
+
+
+def _wake_flusher():
+    loop = _flush_loop
+    if loop is None:
+        return  # no flusher running (scripts) — flush_state() on demand
+    try:
+        on_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        on_loop = False
+    if on_loop:
+        _flush_event.set()
+    else:
+        loop.call_soon_threadsafe(_flush_event.set)  # trackers may run in worker threads
+
+
+async def run_state_flusher():
+    """
+    Debounced writer for tracker bumps. Runs as a scheduler task.
+    Writes STATE_FLUSH_DELAY (5 s) after the first bump; STATE_FLUSH_RETRY (60 s) after a failed write.
+    """
+    global _flush_loop
+    _flush_loop = asyncio.get_running_loop()
+    try:
+        while True:
+            await _flush_event.wait()
+            await asyncio.sleep(STATE_FLUSH_DELAY)  # let the rest of the burst land
+            _flush_event.clear()
+            await flush_state()
+            if _state_dirty:  # write failed — try again later, not every bump
+                await asyncio.sleep(STATE_FLUSH_RETRY)
+                _flush_event.set()
+    finally:
+        _flush_loop = None
+
+
+async def flush_state():
+    """Write the cached state if a tracker changed it."""
+    global _state_dirty
+    with _state_lock:
+        if not _state_dirty or _state_cache is None:
+            return
+        _state_dirty = False
+        snapshot = dict(_state_cache)
+    try:
+        await asyncio.to_thread(_write_state, snapshot)
+    except Exception as e:
+        with _state_lock:
+            _state_dirty = True
         logger.warning(f"Could not save token health state: {e}")
 
 
 # ── System Health ─────────────────────────────
 
-def get_system_health() -> dict:
-    """Return health status for all 8 services (includes Supabase DB + Storage)."""
-    from routers.settings_router import _get_setting
-    state = _load_state()
-    services = []
+# Every setting the health panel reads — fetched together
+HEALTH_SETTING_KEYS = (
+    "gemini_api_key",
+    "pinterest_access_token",
+    "instagram_access_token",
+    "amazon_access_key",
+    "cuelinks_api_key",
+    "gmail_address",
+    "gmail_app_password",
+)
 
-    # 1. Supabase Database
+
+def _probe_db() -> dict:
     try:
         from services.supabase_client import test_connection
         ok, _ = test_connection()
         if ok:
-            services.append({"service": "supabase_db", "label": "Supabase Database", "status": "green", "message": "Connected", "icon": "🗄️"})
-        else:
-            services.append({"service": "supabase_db", "label": "Supabase Database", "status": "red", "message": "Connection failed", "icon": "🗄️"})
+            return {"service": "supabase_db", "label": "Supabase Database", "status": "green", "message": "Connected", "icon": "🗄️"}
+        return {"service": "supabase_db", "label": "Supabase Database", "status": "red", "message": "Connection failed", "icon": "🗄️"}
     except Exception:
-        services.append({"service": "supabase_db", "label": "Supabase Database", "status": "red", "message": "Unreachable", "icon": "🗄️"})
+        return {"service": "supabase_db", "label": "Supabase Database", "status": "red", "message": "Unreachable", "icon": "🗄️"}
+
+
+async def get_system_health() -> dict:
+    """Return health status for all 8 services (includes Supabase DB + Storage)."""
+    from routers.settings_router import _get_settings_bulk
+    # The only I/O: settings (one query, cache misses only), state and a DB
+    # ping. The ping comes after — when the settings read reached Supabase,
+    # test_connection() counts that as proof and skips its own query.
+    cfg, state = await asyncio.gather(
+        asyncio.to_thread(_get_settings_bulk, HEALTH_SETTING_KEYS),
+        asyncio.to_thread(_load_state),
+    )
+    db = await asyncio.to_thread(_probe_db)
+
+    # 1. Supabase Database
+    services = [db]
 
     # 2. Supabase Storage
     storage_usage = state.get("supabase_storage", {})
@@ -70,7 +204,7 @@ def get_system_health() -> dict:
         services.append({"service": "supabase_storage", "label": "Supabase Storage", "status": "green", "message": f"Active ({storage_pct}% used)", "icon": "📦", "usage_pct": storage_pct})
 
     # 3. Gemini
-    key = _get_setting("gemini_api_key")
+    key = cfg.get("gemini_api_key")
     gemini_usage = state.get("gemini_daily_usage", 0)
     gemini_limit = 1500
     if not key:
@@ -85,7 +219,7 @@ def get_system_health() -> dict:
         services.append({"service": "gemini", "label": "Gemini AI", "status": "green", "message": f"Active ({100-pct}% left)", "icon": "🤖", "usage_pct": pct})
 
     # 4. Pinterest
-    token = _get_setting("pinterest_access_token")
+    token = cfg.get("pinterest_access_token")
     pin_expiry = state.get("pinterest_token_expiry")
     if not token:
         services.append({"service": "pinterest", "label": "Pinterest", "status": "grey", "message": "Not connected yet", "icon": "📌"})
@@ -106,7 +240,7 @@ def get_system_health() -> dict:
             services.append({"service": "pinterest", "label": "Pinterest", "status": "yellow", "message": "Token set — not verified", "icon": "📌"})
 
     # 5. Instagram
-    ig_token = _get_setting("instagram_access_token")
+    ig_token = cfg.get("instagram_access_token")
     ig_refreshed = state.get("instagram_last_refreshed")
     if not ig_token:
         services.append({"service": "instagram", "label": "Instagram", "status": "grey", "message": "Not connected yet", "icon": "📸"})
@@ -124,7 +258,7 @@ def get_system_health() -> dict:
         services.append({"service": "instagram", "label": "Instagram", "status": "yellow", "message": "Token set — refresh pending", "icon": "📸"})
 
     # 6. Amazon
-    amz_key = _get_setting("amazon_access_key")
+    amz_key = cfg.get("amazon_access_key")
     amz_fails = state.get("amazon_consecutive_failures", 0)
     if not amz_key:
         services.append({"service": "amazon", "label": "Amazon", "status": "grey", "message": "Not connected yet", "icon": "🟠"})
@@ -134,7 +268,7 @@ def get_system_health() -> dict:
         services.append({"service": "amazon", "label": "Amazon", "status": "green", "message": "Active", "icon": "🟠"})
 
     # 7. Cuelinks
-    cue_key = _get_setting("cuelinks_api_key")
+    cue_key = cfg.get("cuelinks_api_key")
     cue_fails = state.get("cuelinks_consecutive_failures", 0)
     if not cue_key:
         services.append({"service": "cuelinks", "label": "Cuelinks", "status": "grey", "message": "Not connected yet", "icon": "🔵"})
@@ -144,8 +278,8 @@ def get_system_health() -> dict:
         services.append({"service": "cuelinks", "label": "Cuelinks", "status": "green", "message": "Active", "icon": "🔵"})
 
     # 8. Gmail
-    gmail = _get_setting("gmail_address")
-    gmail_pwd = _get_setting("gmail_app_password")
+    gmail = cfg.get("gmail_address")
+    gmail_pwd = cfg.get("gmail_app_password")
     if not gmail or not gmail_pwd:
         services.append({"service": "email", "label": "Gmail", "status": "grey", "message": "Not connected yet", "icon": "📧"})
     else:
@@ -177,35 +311,36 @@ async def check_all_tokens():
     pin_token = _get_setting("pinterest_access_token")
     if pin_token:
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                r = await client.get(
-                    "https://api.pinterest.com/v5/user_account",
-                    headers={"Authorization": f"Bearer {pin_token}"},
-                )
-                if r.status_code == 200:
-                    state["pinterest_last_check_ok"] = True
-                    logger.info("Pinterest token check: OK")
-                elif r.status_code == 401:
-                    refresh_token = _get_setting("pinterest_refresh_token")
-                    app_id = _get_setting("pinterest_app_id")
-                    app_secret = _get_setting("pinterest_app_secret")
-
-                    if refresh_token and app_id and app_secret:
-                        refreshed = await _refresh_pinterest_token(refresh_token, app_id, app_secret)
-                        if refreshed:
-                            _set_setting("pinterest_access_token", refreshed["access_token"])
-                            if refreshed.get("refresh_token"):
-                                _set_setting("pinterest_refresh_token", refreshed["refresh_token"])
-                            state["pinterest_last_check_ok"] = True
-                            logger.info("Pinterest token refreshed successfully!")
-                        else:
-                            state["pinterest_last_check_ok"] = False
-                            await _send_token_alert("Pinterest",
-                                "Pinterest token expired and refresh failed. Please reconnect in Settings → Pinterest.")
+            client = get_http_client()
+            r = await with_retry_async(lambda: client.get(
+                "https://api.pinterest.com/v5/user_account",
+                headers={"Authorization": f"Bearer {pin_token}"},
+                timeout=15,
+            ), retry_on=_TRANSIENT)
+            if r.status_code == 200:
+                state["pinterest_last_check_ok"] = True
+                logger.info("Pinterest token check: OK")
+            elif r.status_code == 401:
+                refresh_token = _get_setting("pinterest_refresh_token")
+                app_id = _get_setting("pinterest_app_id")
+                app_secret = _get_setting("pinterest_app_secret")
+
+                if refresh_token and app_id and app_secret:
+                    refreshed = await _refresh_pinterest_token(refresh_token, app_id, app_secret)
+                    if refreshed:
+                        _set_setting("pinterest_access_token", refreshed["access_token"])
+                        if refreshed.get("refresh_token"):
+                            _set_setting("pinterest_refresh_token", refreshed["refresh_token"])
+                        state["pinterest_last_check_ok"] = True
+                        logger.info("Pinterest token refreshed successfully!")
                     else:
                         state["pinterest_last_check_ok"] = False
                         await _send_token_alert("Pinterest",
-                            "Pinterest token expired. Please reconnect in Settings → Pinterest.")
+                            "Pinterest token expired and refresh failed. Please reconnect in Settings → Pinterest.")
+                else:
+                    state["pinterest_last_check_ok"] = False
+                    await _send_token_alert("Pinterest",
+                        "Pinterest token expired. Please reconnect in Settings → Pinterest.")
         except Exception as e:
             logger.error(f"Pinterest token check failed: {e}")
 
@@ -250,14 +385,24 @@ async def check_all_tokens():
     gmail = _get_setting("gmail_address")
     gmail_pwd = _get_setting("gmail_app_password")
     if gmail and gmail_pwd:
-        try:
-            import smtplib
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=10) as s:
-                s.login(gmail, gmail_pwd)
-            state["gmail_last_check_ok"] = True
-        except Exception as e:
-            state["gmail_last_check_ok"] = False
-            logger.warning(f"Gmail check failed: {e}")
+        # Same credentials that logged in within the day — skip the SMTP round-trip
+        cred_hash = hashlib.blake2s(f"{gmail}\0{gmail_pwd}".encode()).hexdigest()
+        last_ok_at = state.get("gmail_last_ok_at")
+        recently_ok = (
+            state.get("gmail_last_check_ok")
+            and state.get("gmail_cred_hash") == cred_hash
+            and last_ok_at
+            and datetime.now(timezone.utc) - datetime.fromisoformat(last_ok_at) < GMAIL_RECHECK
+        )
+        if not recently_ok:
+            try:
+                await _check_gmail_login(gmail, gmail_pwd)
+                state["gmail_last_check_ok"] = True
+                state["gmail_cred_hash"] = cred_hash
+                state["gmail_last_ok_at"] = datetime.now(timezone.utc).isoformat()
+            except Exception as e:
+                state["gmail_last_check_ok"] = False
+                logger.warning(f"Gmail check failed: {e}")
 
     _save_state(state)
     logger.info("Token health check complete.")
@@ -265,19 +410,27 @@ async def check_all_tokens():
 
 # ── Helpers ───────────────────────────────────
 
+async def _check_gmail_login(gmail: str, password: str):
+    async with aiosmtplib.SMTP(hostname="smtp.gmail.com", port=465, use_tls=True, timeout=10) as smtp:
+        await smtp.login(gmail, password)
+
+
 async def _refresh_pinterest_token(refresh_token: str, app_id: str, app_secret: str) -> dict | None:
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.post(
-                "https://api.pinterest.com/v5/oauth/token",
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": refresh_token,
-                },
-                auth=(app_id, app_secret),
-            )
-            if r.status_code == 200:
-                return r.json()
+        client = get_http_client()
+        # Not retried here: a resend after a lost response can replay a refresh token
+        # Pinterest already rotated (the transport still retries failed connects)
+        r = await client.post(
+            "https://api.pinterest.com/v5/oauth/token",
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+            },
+            auth=(app_id, app_secret),
+            timeout=15,
+        )
+        if r.status_code == 200:
+            return r.json()
     except Exception as e:
         logger.error(f"Pinterest refresh failed: {e}")
     return None
@@ -285,16 +438,17 @@ async def _refresh_pinterest_token(refresh_token: str, app_id: str, app_secret:
 
 async def _refresh_instagram_token(current_token: str) -> str | None:
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                "https://graph.instagram.com/refresh_access_token",
-                params={
-                    "grant_type": "ig_exchange_token",
-                    "access_token": current_token,
-                },
-            )
-            if r.status_code == 200:
-                return r.json().get("access_token")
+        client = get_http_client()
+        r = await with_retry_async(lambda: client.get(
+            "https://graph.instagram.com/refresh_access_token",
+            params={
+                "grant_type": "ig_exchange_token",
+                "access_token": current_token,
+            },
+            timeout=15,
+        ), retry_on=_TRANSIENT)
+        if r.status_code == 200:
+            return r.json().get("access_token")
     except Exception as e:
         logger.error(f"Instagram refresh failed: {e}")
     return None
@@ -341,33 +495,28 @@ async def _send_token_alert(service: str, message: str, is_success: bool = False
 
 def track_gemini_usage():
     """Call after each Gemini API request."""
-    state = _load_state()
-    today = datetime.now().strftime("%Y-%m-%d")
-    if state.get("gemini_usage_date") != today:
-        state["gemini_daily_usage"] = 0
-        state["gemini_usage_date"] = today
-    state["gemini_daily_usage"] = state.get("gemini_daily_usage", 0) + 1
-    _save_state(state)
-    return state["gemini_daily_usage"]
+    def bump(state):
+        today = datetime.now().strftime("%Y-%m-%d")
+        if state.get("gemini_usage_date") != today:
+            state["gemini_daily_usage"] = 0
+            state["gemini_usage_date"] = today
+        state["gemini_daily_usage"] = state.get("gemini_daily_usage", 0) + 1
+        return state["gemini_daily_usage"]
+    return _bump_state(bump)
+
+
+def _track_failure(key: str, success: bool) -> int:
+    def bump(state):
+        state[key] = 0 if success else state.get(key, 0) + 1
+        return state[key]
+    return _bump_state(bump)
 
 
 def track_amazon_failure(success: bool):
     """Track Amazon API consecutive failures."""
-    state = _load_state()
-    if success:
-        state["amazon_consecutive_failures"] = 0
-    else:
-        state["amazon_consecutive_failures"] = state.get("amazon_consecutive_failures", 0) + 1
-    _save_state(state)
-    return state["amazon_consecutive_failures"]
+    return _track_failure("amazon_consecutive_failures", success)
 
 
 def track_cuelinks_failure(success: bool):
     """Track Cuelinks API consecutive failures."""
-    state = _load_state()
-    if success:
-        state["cuelinks_consecutive_failures"] = 0
-    else:
-        state["cuelinks_consecutive_failures"] = state.get("cuelinks_consecutive_failures", 0) + 1
-    _save_state(state)
-    return state["cuelinks_consecutive_failures"]
+    return _track_failure("cuelinks_consecutive_failures", success)
@@ -3,13 +3,47 @@ Trend Detector Service
 Handles: Google Trends, real-time event detection, Pinterest trends scraping.
 All queries are dynamic — driven by user's niche input.
 """
+import asyncio
 import logging
-import time
 import random
+import threading
+import time
+from contextlib import contextmanager
 from typing import Any
 
+import soupsieve as sv
+
 logger = logging.getLogger(__name__)
 
+# Parsed with bs4's lxml builder (C tokenizer), as in services.scraper
+_GOOGLE_RESULT_SEL = sv.compile("h3, .BNeawe")
+_PINTEREST_TREND_TAGS = ["h2", "h3", "span", "a"]
+
+# Trend data moves over hours, not minutes: {niche: (fetched_at, result)}
+TRENDS_CACHE_TTL = 600
+TRENDS_CACHE_MAX = 256
+_trends_cache: dict[str, tuple[float, dict]] = {}
+_trends_lock = threading.Lock()  # analyze_google_trends runs in worker threads
+_pinterest_page: tuple[float, list[str]] | None = None
+
+
+# pytrends bootstraps Google cookies when a TrendReq is built, so keep one
+# per (hl, tz, geo). A TrendReq holds per-query state: one user at a time.
+_pytrends_sessions: dict[tuple, tuple[Any, threading.Lock]] = {}
+_pytrends_guard = threading.Lock()
+
+
+@contextmanager
+def _pytrends(hl: str = "en-US", tz: int = -330, geo: str = ""):
+    from pytrends.request import TrendReq
+    key = (hl, tz, geo)
+    with _pytrends_guard:
+        entry = _pytrends_sessions.get(key)
+        if entry is None:
+            entry = _pytrends_sessions[key] = (TrendReq(hl=hl, tz=tz, geo=geo, timeout=(10, 25)), threading.Lock())
+    with entry[1]:
+        yield entry[0]
+
 
 # ──────────────────────────────────────────────
 # GOOGLE TRENDS ANALYSIS
@@ -18,58 +52,73 @@ def analyze_google_trends(niche: str) -> dict:
     """
     Analyze Google Trends for the niche using pytrends.
     Returns rising queries, breakout queries, geographic data.
+    Successful results are cached per niche for TRENDS_CACHE_TTL.
     """
+    key = niche.strip().lower()
+    with _trends_lock:
+        cached = _trends_cache.get(key)
+    if cached and time.monotonic() - cached[0] < TRENDS_CACHE_TTL:
+        return cached[1]
+
+    result = _fetch_google_trends(niche)
+    if "error" not in result:
+        with _trends_lock:
+            _trends_cache.pop(key, None)
+            if len(_trends_cache) >= TRENDS_CACHE_MAX:
+                del _trends_cache[next(iter(_trends_cache))]  # oldest entry
+            _trends_cache[key] = (time.monotonic(), result)
+    return result
+
+
+def _fetch_google_trends(niche: str) -> dict:
     try:
-        from pytrends.request import TrendReq
-
-        pt = TrendReq(hl="en-US", tz=-330, geo="IN", timeout=(10, 25))
-
-        # Build niche + sub-niche variations for comparison
-        kw_list = [niche]
-        pt.build_payload(kw_list, timeframe="now 7-d", geo="IN")
-
-        interest_over_time = pt.interest_over_time()
-        rising_queries     = {}
-        breakout_queries   = {}
-        related_topics     = {}
-
-        try:
-            related = pt.related_queries()
-            for kw in kw_list:
-                if kw in related:
-                    rising = related[kw].get("rising")
-                    if rising is not None and not rising.empty:
-                        top_rising = rising.head(10).to_dict("records")
-                        rising_queries[kw] = top_rising
-                        breakout_queries[kw] = [
-                            q for q in top_rising if q.get("value", 0) >= 5000
-                        ]
-        except Exception as e:
-            logger.warning(f"Related queries failed: {e}")
-
-        try:
-            topics = pt.related_topics()
-            for kw in kw_list:
-                if kw in topics:
-                    rising_topics = topics[kw].get("rising")
-                    if rising_topics is not None and not rising_topics.empty:
-                        related_topics[kw] = rising_topics.head(5).to_dict("records")
-        except Exception as e:
-            logger.warning(f"Related topics failed: {e}")
-
-        # Interest percentage
-        interest_pct = 0
-        if not interest_over_time.empty and niche in interest_over_time.columns:
-            interest_pct = int(interest_over_time[niche].mean())
-
-        return {
-            "niche": niche,
-            "interest_pct": interest_pct,
-            "rising_queries": rising_queries,
-            "breakout_queries": breakout_queries,
-            "related_topics": related_topics,
-            "is_trending": interest_pct > 40,
-        }
+        with _pytrends(geo="IN") as pt:
+            # Build niche + sub-niche variations for comparison
+            kw_list = [niche]
+            pt.build_payload(kw_list, timeframe="now 7-d", geo="IN")
+
+            interest_over_time = pt.interest_over_time()
+            rising_queries     = {}
+            breakout_queries   = {}
+            related_topics     = {}
+
+            try:
+                related = pt.related_queries()
+                for kw in kw_list:
+                    if kw in related:
+                        rising = related[kw].get("rising")
+                        if rising is not None and not rising.empty:
+                            top_rising = rising.head(10).to_dict("records")
+                            rising_queries[kw] = top_rising
+                            breakout_queries[kw] = [
+                                q for q in top_rising if q.get("value", 0) >= 5000
+                            ]
+            except Exception as e:
+                logger.warning(f"Related queries failed: {e}")
+
+            try:
+                topics = pt.related_topics()
+                for kw in kw_list:
+                    if kw in topics:
+                        rising_topics = topics[kw].get("rising")
+                        if rising_topics is not None and not rising_topics.empty:
+                            related_topics[kw] = rising_topics.head(5).to_dict("records")
+            except Exception as e:
+                logger.warning(f"Related topics failed: {e}")
+
+            # Interest percentage
+            interest_pct = 0
+            if not interest_over_time.empty and niche in interest_over_time.columns:
+                interest_pct = int(interest_over_time[niche].mean())
+
+            return {
+                "niche": niche,
+                "interest_pct": interest_pct,
+                "rising_queries": rising_queries,
+                "breakout_queries": breakout_queries,
+                "related_topics": related_topics,
+                "is_trending": interest_pct > 40,
+            }
 
     except Exception as e:
         logger.error(f"Google Trends failed: {e}")
@@ -79,46 +128,48 @@ def analyze_google_trends(niche: str) -> dict:
 # ──────────────────────────────────────────────
 # REAL-TIME EVENT DETECTION
 # ──────────────────────────────────────────────
-def detect_realtime_events(niche: str) -> dict:
+async def detect_realtime_events(niche: str) -> dict:
     """
     Detect real-time trending topics and events in India
     that could boost this niche. Fully dynamic — no hardcoded festivals.
     """
     from datetime import datetime
-    import requests
-    from bs4 import BeautifulSoup
+    from services.scraper import _get_scrape_client, _pace_host
 
+    client  = _get_scrape_client()
     headers = _get_random_headers()
-    events  = []
-    trending_topics = []
+    month   = datetime.now().strftime("%B %Y")
+    queries = [
+        f"trending in India today",
+        f"upcoming festivals India {month}",
+        f"{niche} trending India",
+    ]
 
-    # SOURCE A — Google search for current trends
-    try:
-        month = datetime.now().strftime("%B %Y")
-        queries = [
-            f"trending in India today",
-            f"upcoming festivals India {month}",
-            f"{niche} trending India",
-        ]
-        for q in queries:
-            time.sleep(random.uniform(2, 4))
-            url = f"https://www.google.com/search?q={q.replace(' ', '+')}&num=5"
-            r = requests.get(url, headers=headers, timeout=15)
-            soup = BeautifulSoup(r.text, "html.parser")
-            texts = [el.get_text(strip=True) for el in soup.select("h3, .BNeawe")]
-            events.extend(texts[:5])
-    except Exception as e:
-        logger.warning(f"Google event search failed: {e}")
+    async def google_search(q: str):
+        # Same host — _pace_host keeps these staggered like the scraper's store fetches
+        await _pace_host("www.google.com")
+        return await client.get(f"https://www.google.com/search?q={q.replace(' ', '+')}&num=5", headers=headers, timeout=15)
 
-    # SOURCE B — pytrends trending searches India
-    try:
-        from pytrends.request import TrendReq
-        pt = TrendReq(hl="en-US", tz=-330)
-        trending = pt.trending_searches(pn="india")
-        if trending is not None and not trending.empty:
-            trending_topics = trending[0].tolist()[:20]
-    except Exception as e:
-        logger.warning(f"pytrends trending failed: {e}")
+    # SOURCE A (Google search for current trends) and SOURCE B (pytrends
+    # trending searches India) hit different hosts — run them side by side
+    *responses, trending = await asyncio.gather(
+        *(google_search(q) for q in queries),
+        asyncio.to_thread(_pytrends_trending_india),
+        return_exceptions=True,
+    )
+
+    events = []
+    for r in responses:
+        if isinstance(r, Exception):
+            logger.warning(f"Google event search failed: {r}")
+            continue
+        events.extend(await asyncio.to_thread(_google_result_texts, r.content))
+
+    trending_topics = []
+    if isinstance(trending, Exception):
+        logger.warning(f"pytrends trending failed: {trending}")
+    else:
+        trending_topics = trending
 
     # Combine and return
     all_items = list(set(events + trending_topics))
@@ -130,32 +181,49 @@ def detect_realtime_events(niche: str) -> dict:
     }
 
 
+def _google_result_texts(body: bytes) -> list[str]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(body, "lxml")
+    texts = [el.get_text(strip=True) for el in _GOOGLE_RESULT_SEL.select(soup)]
+    soup.decompose()
+    return texts[:5]
+
+
+def _pytrends_trending_india() -> list:
+    with _pytrends() as pt:
+        trending = pt.trending_searches(pn="india")
+    if trending is not None and not trending.empty:
+        return trending[0].tolist()[:20]
+    return []
+
+
 # ──────────────────────────────────────────────
 # PINTEREST TRENDS SCRAPING
 # ──────────────────────────────────────────────
-def scrape_pinterest_trends(niche: str) -> dict:
+async def scrape_pinterest_trends(niche: str) -> dict:
     """
     Scrape Pinterest trends page for India.
     Extract trending keywords and topics related to niche.
     """
-    import requests
-    from bs4 import BeautifulSoup
+    from services.scraper import _get_scrape_client
 
-    headers = _get_random_headers()
     trending_keywords = []
 
+    global _pinterest_page
     try:
-        url = "https://trends.pinterest.com/"
-        time.sleep(random.uniform(2, 4))
-        r = requests.get(url, headers=headers, timeout=20)
-        soup = BeautifulSoup(r.text, "html.parser")
-        # Extract any visible trend items
-        items = soup.find_all(["h2", "h3", "span", "a"], limit=100)
-        for item in items:
-            text = item.get_text(strip=True)
-            if niche.lower() in text.lower() or len(text) < 50:
-                trending_keywords.append(text)
-        trending_keywords = list(set(trending_keywords))[:20]
+        # The trends page is the same for every niche — fetch it once per TTL
+        if _pinterest_page and time.monotonic() - _pinterest_page[0] < TRENDS_CACHE_TTL:
+            texts = _pinterest_page[1]
+        else:
+            url = "https://trends.pinterest.com/"
+            await asyncio.sleep(random.uniform(0, 1))
+            r = await _get_scrape_client().get(url, headers=_get_random_headers(), timeout=20)
+            r.raise_for_status()  # never cache a block/error page
+            texts = await asyncio.to_thread(_pinterest_trend_texts, r.content)
+            _pinterest_page = (time.monotonic(), texts)
+        niche_l = niche.lower()
+        # Length check first: short texts qualify without lowercasing them
+        trending_keywords = list({t for t in texts if len(t) < 50 or niche_l in t.lower()})[:20]
     except Exception as e:
         logger.warning(f"Pinterest trends scrape failed: {e}")
 
@@ -166,10 +234,20 @@ def scrape_pinterest_trends(niche: str) -> dict:
     }
 
 
+def _pinterest_trend_texts(body: bytes) -> list[str]:
+    from bs4 import BeautifulSoup, SoupStrainer
+    # Only the tags we read get turned into tree nodes
+    soup = BeautifulSoup(body, "lxml", parse_only=SoupStrainer(_PINTEREST_TREND_TAGS))
+    # Visible trend items; filtered per niche by the caller
+    texts = [item.get_text(strip=True) for item in soup.find_all(_PINTEREST_TREND_TAGS, limit=100)]
+    soup.decompose()
+    return texts
+
+
 # ──────────────────────────────────────────────
 # UTILITY
 # ──────────────────────────────────────────────
-_USER_AGENTS = [
+_USER_AGENTS = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:124.0) Gecko/20100101 Firefox/124.0",
@@ -177,12 +255,12 @@ _USER_AGENTS = [
     "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Mobile Safari/537.36",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
-]
-
+)
 
-def _get_random_headers() -> dict:
-    return {
-        "User-Agent": random.choice(_USER_AGENTS),
+# One ready-made header set per UA; httpx copies headers, never mutates these
+_HEADERS = tuple(
+    {
+        "User-Agent": ua,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
         "Accept-Language": "en-IN,en-US;q=0.9,en;q=0.8,hi;q=0.7",
         "Accept-Encoding": "gzip, deflate, br",
@@ -190,3 +268,9 @@ def _get_random_headers() -> dict:
         "Connection": "keep-alive",
         "Upgrade-Insecure-Requests": "1",
     }
+    for ua in _USER_AGENTS
+)
+
+
+def _get_random_headers() -> dict:
+    return random.choice(_HEADERS)
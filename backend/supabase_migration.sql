@@ -178,6 +178,154 @@ CREATE TABLE IF NOT EXISTS evolution_learning_history (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- =============================================
+-- RPC FUNCTIONS — server-side aggregates
+-- Called via sb.rpc("<name>", {...}).execute()
+-- =============================================
+CREATE OR REPLACE FUNCTION analytics_overview()
+RETURNS TABLE (
+    total_pins BIGINT,
+    total_clicks BIGINT,
+    total_saves BIGINT,
+    total_commission DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        count(*),
+        coalesce(sum(coalesce(pinterest_clicks, 0) + coalesce(instagram_clicks, 0)), 0),
+        coalesce(sum(pinterest_saves), 0),
+        coalesce(sum(estimated_commission), 0)
+    FROM published_pins
+    WHERE status = 'posted';
+$$;
+
+CREATE OR REPLACE FUNCTION dashboard_stats(today_iso TEXT)
+RETURNS TABLE (
+    pins_today BIGINT,
+    total_clicks BIGINT,
+    commission DOUBLE PRECISION,
+    pending BIGINT
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        count(*) FILTER (WHERE status = 'posted' AND posted_at >= today_iso::timestamptz),
+        coalesce(sum(coalesce(pinterest_clicks, 0) + coalesce(instagram_clicks, 0))
+            FILTER (WHERE status = 'posted'), 0),
+        coalesce(sum(estimated_commission) FILTER (WHERE status = 'posted'), 0),
+        count(*) FILTER (WHERE status = 'pending')
+    FROM published_pins;
+$$;
+
+CREATE OR REPLACE FUNCTION recent_activity(limit_n INT DEFAULT 10)
+RETURNS TABLE (
+    log_type TEXT,
+    data TEXT,
+    created_at TIMESTAMPTZ
+)
+LANGUAGE sql STABLE AS $$
+    SELECT log_type, data, created_at
+    FROM evolution_log
+    ORDER BY created_at DESC
+    LIMIT limit_n;
+$$;
+
+CREATE OR REPLACE FUNCTION evolution_summary(history_limit INT DEFAULT 20)
+RETURNS JSON
+LANGUAGE sql STABLE AS $$
+    SELECT json_build_object(
+        'memory', coalesce(
+            (SELECT json_object_agg(key, value) FROM evolution_strategy_memory),
+            '{}'::json),
+        'history', coalesce(
+            (SELECT json_agg(h ORDER BY h.created_at DESC) FROM (
+                SELECT * FROM evolution_learning_history
+                ORDER BY created_at DESC
+                LIMIT history_limit
+            ) h),
+            '[]'::json)
+    );
+$$;
+
+-- Nightly evolution write-back: strategy memory + learning history in one call
+CREATE OR REPLACE FUNCTION nightly_evolution_commit(
+    top_niches_json JSONB,
+    insight_text TEXT,
+    session_count INT,
+    run_at TEXT
+)
+RETURNS VOID
+LANGUAGE sql AS $$
+    INSERT INTO evolution_strategy_memory (key, value, updated_at) VALUES
+        ('top_niches', top_niches_json::text, NOW()),
+        ('last_updated', run_at, NOW())
+    ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO evolution_learning_history (date, research_sessions, insights)
+    VALUES (run_at, session_count, insight_text);
+$$;
+
+-- Research sessions per niche for the nightly analysis.
+-- Older rows hold the event as a JSON string inside the jsonb column.
+CREATE OR REPLACE FUNCTION research_niche_counts(limit_n INT DEFAULT 10)
+RETURNS JSON
+LANGUAGE sql STABLE AS $$
+    WITH events AS (
+        SELECT CASE WHEN jsonb_typeof(data) = 'string'
+                    THEN (data #>> '{}')::jsonb ELSE data END AS data
+        FROM evolution_performance_log
+        WHERE event_type = 'research_complete'
+    ), counts AS (
+        SELECT coalesce(data->>'niche', 'unknown') AS niche, count(*) AS n
+        FROM events
+        GROUP BY 1
+    )
+    SELECT json_build_object(
+        'sessions', (SELECT count(*) FROM events),
+        'top_niches', coalesce(
+            (SELECT json_agg(json_build_array(niche, n) ORDER BY n DESC)
+             FROM (SELECT * FROM counts ORDER BY n DESC LIMIT limit_n) t),
+            '[]'::json)
+    );
+$$;
+
+-- =============================================
+-- INDEXES
+-- =============================================
+-- Partial indexes key on the column the queries filter or sort by (status is
+-- constant inside each predicate); the old status-keyed ones are dropped
+DROP INDEX IF EXISTS idx_published_pins_posted;
+DROP INDEX IF EXISTS idx_published_pins_pending;
+DROP INDEX IF EXISTS idx_published_pins_status_posted_at;
+CREATE INDEX IF NOT EXISTS idx_published_pins_posted_at
+    ON published_pins (posted_at DESC) WHERE status = 'posted';
+CREATE INDEX IF NOT EXISTS idx_published_pins_pending_created
+    ON published_pins (created_at DESC) WHERE status = 'pending';
+
+-- Trigram indexes back the ilike '%…%' filters in list_products
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_products_title_trgm
+    ON products USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_description_trgm
+    ON products USING gin (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_niche_trgm
+    ON products USING gin (niche gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_platform_trgm
+    ON products USING gin (platform gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_evolution_learning_history_created_at
+    ON evolution_learning_history (created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_evolution_log_created_at
+    ON evolution_log (created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_evolution_performance_log_event_type
+    ON evolution_performance_log (event_type);
+
+-- Next-due lookup for the pin publisher loop
+CREATE INDEX IF NOT EXISTS idx_published_pins_pending_scheduled
+    ON published_pins (scheduled_time) WHERE status = 'pending' AND scheduled_time IS NOT NULL;
+
 -- =============================================
 -- STORAGE BUCKET — Run in Supabase → Storage
 -- Create a PUBLIC bucket called "pin-images"